@@ -0,0 +1,95 @@
+import multiprocessing
+import random
+import time
+import uuid
+
+import django
+from django.conf import settings
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.module_loading import import_string
+
+PAGE = 'x' * 20000
+
+
+def _init_worker():
+    django.setup()
+
+
+def _run_worker(args):
+    backend, location, prefix, seed, requests, keys, timeout = args
+    cache = import_string(backend)(location, {'KEY_PREFIX': prefix})
+    rnd = random.Random(seed)
+    hits = 0
+    for _ in range(requests):
+        key = f'page:{rnd.randrange(keys)}'
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, PAGE, timeout)
+    connections.close_all()
+    return hits
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет долю попаданий в кэш у N процессов-воркеров, '
+        'которые рендерят одни и те же страницы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=sorted(settings.CACHE_BACKENDS),
+            help='Бэкенд из settings.CACHE_BACKENDS (по умолчанию текущий).'
+        )
+        parser.add_argument('--location', help='LOCATION бэкенда.')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=4000,
+                            help='Запросов на все воркеры вместе.')
+        parser.add_argument('--keys', type=int, default=200,
+                            help='Сколько разных страниц запрашивается.')
+        parser.add_argument('--timeout', type=int, default=300)
+
+    def handle(self, *args, **options):
+        if options['backend']:
+            backend, location = settings.CACHE_BACKENDS[options['backend']]
+        else:
+            backend = settings.CACHES['default']['BACKEND']
+            location = settings.CACHES['default'].get('LOCATION', '')
+        location = options['location'] or location
+        try:
+            backend_class = import_string(backend)
+        except ImportError as error:
+            raise CommandError(f'Бэкенд {backend} недоступен: {error}')
+        if issubclass(backend_class, DatabaseCache):
+            self.create_table(location)
+        connections.close_all()
+        self.stdout.write(f'{backend} ({location or "-"})')
+        self.stdout.write('воркеров  запросов  попаданий  доля   запр/с')
+        for workers in range(1, options['workers'] + 1):
+            prefix = uuid.uuid4().hex
+            per_worker = options['requests'] // workers
+            jobs = [
+                (backend, location, prefix, seed, per_worker,
+                 options['keys'], options['timeout'])
+                for seed in range(workers)
+            ]
+            started = time.perf_counter()
+            with multiprocessing.Pool(workers, _init_worker) as pool:
+                hits = sum(pool.map(_run_worker, jobs))
+            elapsed = time.perf_counter() - started
+            total = workers * per_worker
+            self.stdout.write(
+                f'{workers:>8}  {total:>8}  {hits:>9}  '
+                f'{hits / total:>5.1%}  {total / elapsed:>7.0f}'
+            )
+
+    @staticmethod
+    def create_table(location):
+        from django.core.management.commands.createcachetable import (
+            Command as CreateCacheTable
+        )
+        command = CreateCacheTable()
+        command.verbosity = 0
+        command.create_table('default', location, False)
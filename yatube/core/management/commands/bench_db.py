@@ -0,0 +1,141 @@
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import (
+    OperationalError, connection, connections, transaction
+)
+from django.test.utils import override_settings
+
+from posts.models import Comment, Post, User
+from posts.settings import POSTS_ON_PAGE
+
+MARKER = 'bench_db'
+# Журнал SQLite по умолчанию. Остальные PRAGMA без SQLITE_PRAGMAS
+# остаются встроенными: fsync на каждый коммит, без mmap, кэш 2 МиБ.
+DEFAULT_JOURNAL_MODE = 'delete'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность базы при новом соединении на '
+        'каждый запрос и при постоянных соединениях (CONN_MAX_AGE), а на '
+        'SQLite ещё и с SQLITE_PRAGMAS против настроек по умолчанию. '
+        'Потоки имитируют запросы: страница ленты и доля записей '
+        'комментариев; записанные комментарии удаляются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5,
+                            help='Длительность замера каждой настройки.')
+        parser.add_argument(
+            '--write-share', type=float, default=0.1,
+            help='Доля запросов, которые пишут комментарий.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.post_ids = list(
+            Post.objects.order_by('-pub_date')
+            .values_list('id', flat=True)[:POSTS_ON_PAGE * 100]
+        )
+        self.user_ids = list(User.objects.values_list('id', flat=True)[:1000])
+        if not self.post_ids:
+            raise CommandError('Нет постов: заполните базу seed_bulk.')
+        configs = [
+            ('новое соединение', True, {}),
+            ('CONN_MAX_AGE', False, {}),
+        ]
+        if connection.vendor == 'sqlite':
+            configs += [
+                ('SQLITE_PRAGMAS', True, settings.SQLITE_PRAGMAS),
+                ('оба', False, settings.SQLITE_PRAGMAS),
+            ]
+        self.stdout.write(
+            'соединения          запросов/с   p50, мс   p95, мс   ошибок'
+        )
+        try:
+            for name, reconnect, pragmas in configs:
+                pragmas = dict(pragmas)
+                journal_mode = pragmas.pop(
+                    'journal_mode', DEFAULT_JOURNAL_MODE
+                )
+                # Соединения потоков получают только PRAGMA соединения:
+                # режим журнала хранится в файле базы, а его смена на
+                # каждом соединении упирается в блокировки других потоков.
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    self.set_journal_mode(journal_mode)
+                    self.measure(name, reconnect, options)
+        finally:
+            connections.close_all()
+            Comment.objects.filter(text=MARKER).delete()
+
+    @staticmethod
+    def set_journal_mode(mode):
+        # Режим журнала меняется только без других соединений.
+        connections.close_all()
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA journal_mode = {mode}')
+        connection.close()
+
+    def measure(self, name, reconnect, options):
+        deadline = time.perf_counter() + options['seconds']
+        timings = []
+        errors = []
+        threads = [
+            threading.Thread(target=self.work, args=(
+                random.Random(options['seed'] + i), reconnect,
+                options['write_share'], deadline, timings, errors
+            ))
+            for i in range(options['threads'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        timings.sort()
+        if not timings:
+            raise CommandError(f'{name}: все запросы с ошибками, {errors[0]}')
+        self.stdout.write(
+            f'{name:<18}  {len(timings) / options["seconds"]:>10.0f}'
+            f'  {statistics.median(timings):>8.2f}'
+            f'  {timings[int(len(timings) * 0.95) - 1]:>8.2f}'
+            f'  {len(errors):>7}'
+        )
+
+    def work(self, rnd, reconnect, write_share, deadline, timings, errors):
+        try:
+            while time.perf_counter() < deadline:
+                if reconnect:
+                    # Так close_old_connections делает при CONN_MAX_AGE = 0.
+                    connection.close()
+                started = time.perf_counter()
+                try:
+                    self.request(rnd, write_share)
+                except OperationalError as error:
+                    errors.append(error)
+                    continue
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+
+    def request(self, rnd, write_share):
+        offset = rnd.randrange(len(self.post_ids))
+        list(Post.objects.feed().order_by('-pub_date')[
+            offset:offset + POSTS_ON_PAGE
+        ])
+        if rnd.random() < write_share:
+            # Комментарий и счётчик поста пишутся вместе: иначе ошибка
+            # блокировки между ними сбила бы comment_count.
+            with transaction.atomic():
+                Comment.objects.create(
+                    post_id=rnd.choice(self.post_ids),
+                    author_id=rnd.choice(self.user_ids),
+                    text=MARKER
+                )
@@ -0,0 +1,113 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import perf
+
+COLUMNS = {
+    'count': 'запросов',
+    'p50': 'p50, мс',
+    'p95': 'p95, мс',
+    'p99': 'p99, мс',
+    'sql': 'SQL, мс',
+    'queries': 'SQL-запросов',
+    'template': 'шаблоны, мс',
+    'duplicates': 'с повторами',
+}
+# Столбцы-счётчики, остальные — средние и перцентили.
+COUNTS = ('count', 'duplicates')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка замеров PerfMiddleware по вьюхам: перцентили полного '
+        'времени, время и число SQL-запросов, время шаблонов, запросы с '
+        'повторяющимся SQL и гистограмма времени ответа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort', choices=sorted(COLUMNS), default='p95',
+            help='По какому столбцу сортировать, по убыванию.'
+        )
+        parser.add_argument('--json', action='store_true')
+        parser.add_argument(
+            '--flamegraph', metavar='FILE',
+            help=(
+                'Записать свёрнутые стеки шаблонов (YATUBE_PERF_TEMPLATES=1) '
+                'для flamegraph.pl или speedscope; «-» — в вывод.'
+            )
+        )
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Удалить накопленные замеры после вывода.'
+        )
+
+    def handle(self, *args, **options):
+        if options['flamegraph']:
+            self.write_flamegraph(options['flamegraph'])
+        else:
+            self.write_report(options)
+        if options['reset']:
+            perf.reset()
+
+    def write_flamegraph(self, path):
+        lines = perf.flame()
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line)
+            return
+        with open(path, 'w') as output:
+            output.writelines(f'{line}\n' for line in lines)
+        self.stdout.write(f'Стеков: {len(lines)}, записаны в {path}')
+
+    def write_report(self, options):
+        report = {
+            view: perf.summary(samples)
+            for view, samples in perf.collect().items()
+        }
+        views = sorted(
+            report, key=lambda view: report[view][options['sort']],
+            reverse=True
+        )
+        if options['json']:
+            self.stdout.write(json.dumps(
+                {view: report[view] for view in views},
+                ensure_ascii=False, indent=2
+            ))
+        elif not views:
+            self.stdout.write(
+                'Замеров нет: включите YATUBE_PERF_SAMPLE_RATE.'
+            )
+        else:
+            self.write_table(report, views)
+
+    def write_table(self, report, views):
+        width = max(len(view) for view in views)
+        self.stdout.write(
+            f'{"вьюха":<{width}}'
+            + ''.join(f'  {title:>12}' for title in COLUMNS.values())
+        )
+        for view in views:
+            row = report[view]
+            self.stdout.write(
+                f'{view:<{width}}'
+                + ''.join(
+                    f'  {row[column]:>12}' if column in COUNTS
+                    else f'  {row[column]:>12.1f}'
+                    for column in COLUMNS
+                )
+            )
+        bounds = [f'≤{bound}' for bound in perf.BUCKETS]
+        bounds.append(f'>{perf.BUCKETS[-1]}')
+        self.stdout.write('')
+        self.stdout.write(
+            f'{"время, мс":<{width}}'
+            + ''.join(f'  {bound:>6}' for bound in bounds)
+        )
+        for view in views:
+            self.stdout.write(
+                f'{view:<{width}}' + ''.join(
+                    f'  {count:>6}' for count in report[view]['histogram']
+                )
+            )
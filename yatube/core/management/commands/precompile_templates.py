@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.precompile import precompile_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны из каталогов TEMPLATES и завершается ошибкой, '
+        'если какой-то не разбирается. В продакшене (yatube.settings.prod) '
+        'то же самое делает каждый воркер при старте, чтобы шаблоны были в '
+        'кэше cached.Loader до первого запроса.'
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count, errors = precompile_templates()
+        elapsed = (time.perf_counter() - started) * 1000
+        for name, error in errors.items():
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(f'Шаблонов с ошибками: {len(errors)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Шаблонов: {count} за {elapsed:.0f} мс'
+        ))
@@ -0,0 +1,54 @@
+import logging
+import random
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import perf
+
+logger = logging.getLogger(__name__)
+
+# Под одним ключом все адреса без маршрута: иначе каждый случайный
+# путь из 404 заводил бы своё окно замеров.
+UNRESOLVED = '<unresolved>'
+
+
+class PerfMiddleware:
+    """Замеряет долю PERF_SAMPLE_RATE запросов.
+
+    Для каждой вьюхи копит число и время SQL-запросов, время рендера
+    шаблонов и полное время и предупреждает о повторяющихся запросах.
+    Заголовок Server-Timing получают сотрудники, а с PERF_SERVER_TIMING —
+    все. С PERF_TEMPLATE_PROFILE копится ещё и время каждого include,
+    url, тега и фильтра для flame graph.
+    При PERF_SAMPLE_RATE = 0 Django убирает middleware из цепочки.
+    """
+
+    def __init__(self, get_response):
+        self.rate = settings.PERF_SAMPLE_RATE
+        if not self.rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.profile = settings.PERF_TEMPLATE_PROFILE
+        perf.instrument_templates()
+        if self.profile:
+            perf.profile_templates()
+
+    def __call__(self, request):
+        if self.rate < 1 and random.random() >= self.rate:
+            return self.get_response(request)
+        profile = perf.Profile() if self.profile else None
+        with perf.measure(perf.Stats(), profile) as stats:
+            response = self.get_response(request)
+        match = request.resolver_match
+        view = match.view_name if match else UNRESOLVED
+        perf.recorder().add(view, stats, profile)
+        user = getattr(request, 'user', None)
+        if settings.PERF_SERVER_TIMING or user and user.is_staff:
+            response['Server-Timing'] = stats.server_timing()
+        if stats.duplicates:
+            logger.warning(
+                '%s: повторных SQL-запросов %s, например: %s',
+                view, stats.duplicates, stats.duplicate_sql
+            )
+        return response
@@ -0,0 +1,333 @@
+import math
+import os
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.template import engines
+from django.template.base import Template
+from django.template.defaulttags import URLNode
+from django.template.library import InclusionNode, SimpleNode
+from django.template.loader_tags import IncludeNode
+from sorl.thumbnail.templatetags.thumbnail import ThumbnailNodeBase
+
+PROCESSES_KEY = 'core:perf:processes'
+PROCESS_KEY = 'core:perf:{}'
+# Верхние границы корзин гистограммы полного времени, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000)
+
+_local = threading.local()
+_recorder = None
+_instrumented = False
+_profiled = False
+# (класс или словарь фильтров, имя, исходное значение) для uninstrument.
+_patched = []
+
+
+class Stats:
+    """Замер одного запроса; время в секундах."""
+
+    def __init__(self):
+        self.wall = 0
+        self.sql = 0
+        self.template = 0
+        self.queries = 0
+        self.duplicates = 0
+        self.duplicate_sql = None
+        self.rendering = False
+        self._seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка connection.execute_wrapper.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+            key = (sql, repr(params))
+            if key in self._seen:
+                self.duplicates += 1
+                self.duplicate_sql = sql
+            else:
+                self._seen.add(key)
+
+    def server_timing(self):
+        return (
+            f'sql;dur={self.sql * 1000:.1f};desc="{self.queries} queries, '
+            f'{self.duplicates} duplicate", '
+            f'tpl;dur={self.template * 1000:.1f}, '
+            f'total;dur={self.wall * 1000:.1f}'
+        )
+
+    def sample(self):
+        return (
+            self.wall * 1000, self.sql * 1000, self.queries,
+            self.template * 1000, self.duplicates
+        )
+
+
+class Profile:
+    """Дерево вызовов шаблонов одного запроса.
+
+    Собственное время каждого кадра копится по его стеку в формате
+    свёрнутых стеков flame graph: ``шаблон;include ...;url ...``; пустой
+    стек — время запроса вне шаблонов.
+    """
+
+    def __init__(self):
+        self.path = []
+        # Время вложенных кадров на каждом уровне стека.
+        self.nested = [0]
+        self.stacks = defaultdict(float)
+
+    @contextmanager
+    def frame(self, name):
+        self.path.append(name)
+        self.nested.append(0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stacks[';'.join(self.path)] += elapsed - self.nested.pop()
+            self.path.pop()
+            self.nested[-1] += elapsed
+
+    def finish(self, wall):
+        self.stacks[''] += wall - self.nested[0]
+
+
+@contextmanager
+def measure(stats, profile=None):
+    """Считает SQL всех соединений и рендер шаблонов в текущем потоке."""
+    _local.stats = stats
+    _local.profile = profile
+    started = time.perf_counter()
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            yield stats
+    finally:
+        stats.wall = time.perf_counter() - started
+        _local.stats = _local.profile = None
+        if profile is not None:
+            profile.finish(stats.wall)
+
+
+def instrument_templates():
+    """Оборачивает Template.render: время считается по внешнему шаблону.
+
+    Вложенные include и extends попадают во время внешнего рендера.
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    render = Template.render
+
+    @wraps(render)
+    def timed_render(self, context):
+        stats = getattr(_local, 'stats', None)
+        if stats is None or stats.rendering:
+            return render(self, context)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            profile = _local.profile
+            if profile is None:
+                return render(self, context)
+            with profile.frame(
+                f'template {self.name or self.origin.name}'
+            ):
+                return render(self, context)
+        finally:
+            stats.template += time.perf_counter() - started
+            stats.rendering = False
+
+    _patch(Template, 'render', timed_render)
+    _instrumented = True
+
+
+def _patch(target, name, value):
+    if isinstance(target, dict):
+        _patched.append((target, name, target[name]))
+        target[name] = value
+    else:
+        # None — атрибут унаследован, при откате его надо просто удалить.
+        _patched.append((target, name, vars(target).get(name)))
+        setattr(target, name, value)
+
+
+def uninstrument():
+    """Снимает обёртки instrument_templates и profile_templates."""
+    global _instrumented, _profiled
+    while _patched:
+        target, name, original = _patched.pop()
+        if isinstance(target, dict):
+            target[name] = original
+        elif original is None:
+            delattr(target, name)
+        else:
+            setattr(target, name, original)
+    _instrumented = _profiled = False
+
+
+def profiled(render, label):
+    @wraps(render)
+    def profiled_render(*args, **kwargs):
+        profile = getattr(_local, 'profile', None)
+        if profile is None:
+            return render(*args, **kwargs)
+        with profile.frame(label(*args)):
+            return render(*args, **kwargs)
+
+    return profiled_render
+
+
+def token(expression):
+    # Имя из литерала в теге: 'posts/includes/details.html' без кавычек.
+    return expression.token.strip('"\'')
+
+
+def profile_templates():
+    """Добавляет в Profile кадры include, url, тегов и фильтров.
+
+    Фильтры оборачиваются в библиотеках шаблонов, поэтому попадают в
+    профиль только у шаблонов, разобранных после вызова.
+    """
+    global _profiled
+    if _profiled:
+        return
+    for node, label in (
+        (IncludeNode, lambda node, context: f'include {token(node.template)}'),
+        (URLNode, lambda node, context: f'url {token(node.view_name)}'),
+        (SimpleNode, lambda node, context: f'tag {node.func.__name__}'),
+        (InclusionNode, lambda node, context: f'tag {node.func.__name__}'),
+        (ThumbnailNodeBase, lambda node, context: 'tag thumbnail'),
+    ):
+        _patch(node, 'render', profiled(node.render, label))
+    for engine in engines.all():
+        engine = getattr(engine, 'engine', None)
+        if engine is None:
+            continue
+        for library in (
+            *engine.template_builtins, *engine.template_libraries.values()
+        ):
+            for name, function in list(library.filters.items()):
+                _patch(library.filters, name, profiled(
+                    function, lambda *args, name=name: f'filter {name}'
+                ))
+    _profiled = True
+
+
+class Recorder:
+    """Скользящее окно замеров по вьюхам в памяти процесса.
+
+    Раз в PERF_FLUSH_INTERVAL секунд окно публикуется в кэш, откуда его
+    читает perf_report; общий для воркеров кэш собирает все процессы.
+    """
+
+    def __init__(self, window):
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        # Собственное время кадров шаблонов по стекам с запуска, мкс.
+        self.stacks = defaultdict(int)
+        self.key = PROCESS_KEY.format(f'{socket.gethostname()}:{os.getpid()}')
+        self.flushed = None
+
+    def add(self, view, stats, profile=None):
+        self.samples[view].append(stats.sample())
+        if profile is not None:
+            # Вьюха — корень стеков, её разрешают уже после рендера.
+            for stack, elapsed in profile.stacks.items():
+                stack = f'{view};{stack}' if stack else view
+                self.stacks[stack] += round(elapsed * 1000000)
+        now = time.monotonic()
+        if (self.flushed is None
+                or now - self.flushed >= settings.PERF_FLUSH_INTERVAL):
+            self.flushed = now
+            self.flush()
+
+    def snapshot(self):
+        return {
+            'samples': {
+                view: list(samples)
+                for view, samples in list(self.samples.items())
+            },
+            'stacks': dict(self.stacks),
+        }
+
+    def flush(self):
+        cache.set(self.key, self.snapshot(), settings.PERF_TTL)
+        processes = cache.get(PROCESSES_KEY) or set()
+        if self.key not in processes:
+            cache.set(PROCESSES_KEY, processes | {self.key}, None)
+
+
+def recorder():
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder(settings.PERF_WINDOW)
+    return _recorder
+
+
+def snapshots():
+    processes = cache.get(PROCESSES_KEY) or set()
+    return cache.get_many(list(processes)).values()
+
+
+def collect():
+    """Окна всех процессов, объединённые по вьюхам."""
+    merged = defaultdict(list)
+    for snapshot in snapshots():
+        for view, samples in snapshot['samples'].items():
+            merged[view].extend(samples)
+    return dict(merged)
+
+
+def flame():
+    """Свёрнутые стеки шаблонов всех процессов, время в мкс.
+
+    Строки ``стек значение`` понимают flamegraph.pl, speedscope и
+    inferno.
+    """
+    merged = defaultdict(int)
+    for snapshot in snapshots():
+        for stack, elapsed in snapshot['stacks'].items():
+            merged[stack] += elapsed
+    return [f'{stack} {merged[stack]}' for stack in sorted(merged)]
+
+
+def reset():
+    global _recorder
+    cache.delete_many(list(cache.get(PROCESSES_KEY) or ()) + [PROCESSES_KEY])
+    _recorder = None
+
+
+def percentile(values, share):
+    return values[max(math.ceil(len(values) * share) - 1, 0)]
+
+
+def summary(samples):
+    walls = sorted(sample[0] for sample in samples)
+    histogram = [0] * (len(BUCKETS) + 1)
+    for wall in walls:
+        histogram[sum(wall > bound for bound in BUCKETS)] += 1
+    return {
+        'count': len(samples),
+        'p50': percentile(walls, 0.5),
+        'p95': percentile(walls, 0.95),
+        'p99': percentile(walls, 0.99),
+        'sql': statistics.mean(sample[1] for sample in samples),
+        'queries': statistics.mean(sample[2] for sample in samples),
+        'template': statistics.mean(sample[3] for sample in samples),
+        'duplicates': sum(bool(sample[4]) for sample in samples),
+        'histogram': histogram,
+    }
@@ -0,0 +1,30 @@
+import os
+
+from django.template import TemplateSyntaxError, engines
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.relpath(os.path.join(root, name), directory)
+            yield path.replace(os.sep, '/')
+
+
+def precompile_templates():
+    """Разбирает все шаблоны из DIRS движков.
+
+    С cached.Loader разобранные шаблоны остаются в памяти процесса, и
+    первый запрос воркера их не разбирает. Возвращает число шаблонов и
+    ошибки по именам: синтаксис или файл не в FILE_CHARSET.
+    """
+    count = 0
+    errors = {}
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for name in template_names(directory):
+                count += 1
+                try:
+                    engine.get_template(name)
+                except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                    errors[name] = error
+    return count, errors
@@ -1,4 +1,35 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.template import engines
+from django.template.base import Template
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core import perf
+from core.templatetags import user_filters
+from core.precompile import precompile_templates
+from posts.forms import PostForm
+from posts.models import Post, User
+
+INDEX_URL = '/'
+
+
+def import_prod(**environ):
+    sys.modules.pop('yatube.settings.prod', None)
+    with mock.patch.dict(os.environ, environ):
+        return importlib.import_module('yatube.settings.prod')
 
 
 class CoreTest(TestCase):
@@ -6,3 +37,258 @@ class CoreTest(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SqlitePragmasTests(TestCase):
+    def test_pragmas_applied(self):
+        # Тестовая база в памяти, journal_mode=wal к ней неприменим.
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234})
+    def test_pragmas_from_settings(self):
+        # synchronous в транзакции теста уже не поменять.
+        connection_created.send(
+            sender=connection.__class__, connection=connection
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+
+class BenchDbTests(TransactionTestCase):
+    # Потоки команды ходят в базу своими соединениями и видят только
+    # закоммиченное, поэтому без транзакции теста.
+    def test_smoke(self):
+        user = User.objects.create_user(username='bench')
+        Post.objects.create(author=user, text='Тестовый пост')
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        def wrap(sender, connection, **kwargs):
+            connection.execute_wrappers.append(record)
+
+        connection_created.connect(wrap)
+        self.addCleanup(connection_created.disconnect, wrap)
+        output = StringIO()
+        with connection.execute_wrapper(record):
+            call_command(
+                'bench_db', '--threads', '2', '--seconds', '0.1',
+                stdout=output
+            )
+        lines = output.getvalue().splitlines()
+        self.assertIn('запросов/с', lines[0])
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]],
+            ['новое', 'CONN_MAX_AGE', 'SQLITE_PRAGMAS', 'оба']
+        )
+        # Режим журнала ставится один раз на настройку, не в потоках.
+        wal = settings.SQLITE_PRAGMAS['journal_mode']
+        self.assertEqual(
+            [sql for sql in statements if 'journal_mode' in sql],
+            [
+                f'PRAGMA journal_mode = {mode}'
+                for mode in ('delete', 'delete', wal, wal)
+            ]
+        )
+
+
+class BenchCacheTests(TestCase):
+    def test_locmem(self):
+        output = StringIO()
+        call_command(
+            'bench_cache', '--backend', 'locmem', '--workers', '1',
+            '--requests', '20', '--keys', '5', stdout=output
+        )
+        lines = output.getvalue().splitlines()
+        self.assertIn('LocMemCache', lines[0])
+        workers, total, hits, _, _ = lines[2].split()
+        self.assertEqual((workers, total), ('1', '20'))
+        self.assertGreaterEqual(int(hits), 15)
+
+
+class PerfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='perf')
+        cls.post = Post.objects.create(author=cls.user, text='Замер')
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(perf.reset)
+        self.addCleanup(perf.uninstrument)
+
+    def test_off_by_default(self):
+        response = self.client.get(INDEX_URL)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(perf.collect(), {})
+
+    @override_settings(PERF_SAMPLE_RATE=1, PERF_FLUSH_INTERVAL=0)
+    def test_records_views(self):
+        response = self.client.get(INDEX_URL)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^sql;dur=[\d.]+;desc="\d+ queries, \d+ duplicate", '
+            r'tpl;dur=[\d.]+, total;dur=[\d.]+$'
+        )
+        self.client.get(INDEX_URL)
+        report = StringIO()
+        call_command('perf_report', '--json', stdout=report)
+        index = json.loads(report.getvalue())['posts:index']
+        self.assertEqual(index['count'], 2)
+        self.assertEqual(sum(index['histogram']), 2)
+        self.assertGreater(index['template'], 0)
+        call_command('perf_report', '--reset', stdout=StringIO())
+        self.assertEqual(perf.collect(), {})
+
+    @override_settings(
+        PERF_SAMPLE_RATE=1, PERF_FLUSH_INTERVAL=0, PERF_SERVER_TIMING=False
+    )
+    def test_server_timing_for_staff(self):
+        self.assertNotIn('Server-Timing', self.client.get(INDEX_URL))
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertIn('Server-Timing', self.client.get(INDEX_URL))
+
+    @override_settings(PERF_SAMPLE_RATE=1, PERF_FLUSH_INTERVAL=0)
+    def test_unresolved_paths_share_a_key(self):
+        self.client.get('/nonexist-page/')
+        self.client.get('/other-nonexist-page/')
+        self.assertEqual(list(perf.collect()), ['<unresolved>'])
+        self.assertEqual(len(perf.collect()['<unresolved>']), 2)
+
+    def test_duplicates(self):
+        with perf.measure(perf.Stats()) as stats:
+            for _ in range(3):
+                Post.objects.get(pk=self.post.pk)
+            User.objects.count()
+        self.assertEqual(stats.queries, 4)
+        self.assertEqual(stats.duplicates, 2)
+        self.assertIn('posts_post', stats.duplicate_sql)
+
+    @override_settings(
+        PERF_SAMPLE_RATE=1, PERF_FLUSH_INTERVAL=0, PERF_TEMPLATE_PROFILE=True
+    )
+    def test_template_profile(self):
+        self.client.get(INDEX_URL)
+        output = StringIO()
+        call_command('perf_report', '--flamegraph', '-', stdout=output)
+        stacks = dict(
+            line.rsplit(' ', 1) for line in output.getvalue().splitlines()
+        )
+        details = (
+            'posts:index;template posts/index.html;'
+            'include posts/includes/details.html'
+        )
+        for stack in (
+            'posts:index',
+            details,
+            f'{details};url posts:profile',
+            f'{details};tag post_picture',
+            'posts:index;template posts/index.html;'
+            'include includes/paginator.html',
+        ):
+            with self.subTest(stack=stack):
+                self.assertIn(stack, stacks)
+                self.assertGreaterEqual(int(stacks[stack]), 0)
+
+    def test_profile_filters(self):
+        perf.instrument_templates()
+        perf.profile_templates()
+        template = engines['django'].from_string(
+            '{% load user_filters %}{{ text|lower }}{{ text|lower }}'
+            '{{ form.text|addclass:"wide" }}'
+        )
+        profile = perf.Profile()
+        with perf.measure(perf.Stats(), profile):
+            html = template.render({'text': 'A', 'form': PostForm()})
+        self.assertTrue(html.startswith('aa'))
+        self.assertIn('class="wide"', html)
+        # addclass рендерит шаблоны виджета, их кадры вложены в его кадр.
+        self.assertLessEqual({
+            '',
+            'template <unknown source>',
+            'template <unknown source>;filter lower',
+            'template <unknown source>;filter addclass',
+        }, set(profile.stacks))
+        self.assertTrue(all(
+            stack.startswith('template <unknown source>;filter addclass;')
+            for stack in profile.stacks
+            if stack.count(';') > 1
+        ))
+        self.assertTrue(all(
+            elapsed >= 0 for elapsed in profile.stacks.values()
+        ))
+
+    def test_uninstrument_restores_templates(self):
+        render = Template.render
+        filters = dict(user_filters.register.filters)
+        perf.instrument_templates()
+        perf.profile_templates()
+        self.assertIsNot(Template.render, render)
+        self.assertIsNot(
+            user_filters.register.filters['addclass'], filters['addclass']
+        )
+        perf.uninstrument()
+        self.assertIs(Template.render, render)
+        self.assertEqual(user_filters.register.filters, filters)
+
+
+class ProdSettingsTests(TestCase):
+    def test_shared_cache_required(self):
+        for cache_name in ('', 'locmem', 'file'):
+            with self.subTest(cache=cache_name):
+                with self.assertRaisesMessage(
+                    ImproperlyConfigured, 'memcached, redis'
+                ):
+                    import_prod(YATUBE_CACHE=cache_name)
+        self.assertEqual(
+            import_prod(YATUBE_CACHE='memcached').SHARED_CACHES,
+            ('memcached', 'redis')
+        )
+
+
+class PrecompileTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.names = {
+            os.path.relpath(os.path.join(root, name), settings.TEMPLATES_DIR)
+            for root, _, files in os.walk(settings.TEMPLATES_DIR)
+            for name in files
+        }
+
+    @override_settings(TEMPLATES=import_prod(YATUBE_CACHE='redis').TEMPLATES)
+    def test_templates_cached(self):
+        output = StringIO()
+        call_command('precompile_templates', stdout=output)
+        self.assertIn(f'Шаблонов: {len(self.names)}', output.getvalue())
+        loader = engines['django'].engine.template_loaders[0]
+        self.assertEqual(set(loader.get_template_cache), self.names)
+
+    def test_broken_template(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        os.mkdir(os.path.join(directory, 'posts'))
+        with open(os.path.join(directory, 'posts', 'broken.html'), 'w') as f:
+            f.write('{% if %}')
+        with open(os.path.join(directory, 'ok.html'), 'w') as f:
+            f.write('{{ ok }}')
+        with open(os.path.join(directory, 'cp1251.html'), 'wb') as f:
+            f.write('Привет'.encode('cp1251'))
+        templates = [{**settings.TEMPLATES[0], 'DIRS': [directory]}]
+        with override_settings(TEMPLATES=templates):
+            count, errors = precompile_templates()
+            self.assertEqual(count, 3)
+            self.assertEqual(
+                set(errors), {'posts/broken.html', 'cp1251.html'}
+            )
+            with self.assertRaisesMessage(CommandError, 'с ошибками: 2'):
+                call_command(
+                    'precompile_templates', stdout=StringIO(),
+                    stderr=StringIO()
+                )
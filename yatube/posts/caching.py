@@ -0,0 +1,167 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from posts.settings import PAGE_CACHE_HEADER, PAGE_CACHE_TIMEOUT
+
+VERSION_KEY = 'posts:version:{}'
+PAGE_KEY = 'posts:page:{}'
+ALL_POSTS = 'posts'
+GROUP = 'group:{}'
+AUTHOR = 'author:{}'
+FOLLOW = 'follow:{}'
+POST = 'post:{}'
+TRENDING = 'trending'
+GROUPS = 'groups'
+SECOND = 1000000
+
+
+def _now():
+    return int(time.time() * SECOND)
+
+
+def versions(*scopes):
+    """Версии областей: время их последнего изменения в микросекундах."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _now() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def version(*scopes):
+    return ';'.join(
+        f'{scope}={value}'
+        for scope, value in zip(scopes, versions(*scopes))
+    )
+
+
+def page_versions(request, scopes, args, kwargs):
+    """Версии областей страницы, один раз на запрос."""
+    if not hasattr(request, '_page_versions'):
+        request._page_versions = versions(*scopes(request, *args, **kwargs))
+    return request._page_versions
+
+
+def conditional(scopes):
+    """Conditional GET по версиям областей страницы.
+
+    ``scopes(request, *args, **kwargs)`` возвращает области, из которых
+    собрана страница. ETag зависит от версий, адреса и зрителя.
+    Last-Modified — время последнего изменения — зрителя не различает,
+    поэтому отдаётся только анонимам. Заголовок точен до секунды, а версии
+    до микросекунды: время округляется вверх и отдаётся, только когда эта
+    секунда прошла, иначе правка в ту же секунду вернула бы клиенту
+    с If-Modified-Since устаревшую страницу.
+    """
+    def etag(request, *args, **kwargs):
+        values = page_versions(request, scopes, args, kwargs)
+        key = '|'.join([
+            *map(str, values),
+            request.get_full_path(),
+            str(request.user.pk),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ])
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        values = page_versions(request, scopes, args, kwargs)
+        second = max(values) // SECOND + 1
+        if second * SECOND > _now():
+            return None
+        return datetime.fromtimestamp(second, timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def page_cache(scopes):
+    """Кэш целых ответов для анонимов.
+
+    Ключ — адрес с параметрами и версии областей страницы, так что запись,
+    меняющая версии, сразу делает старую копию недостижимой. Запросы
+    авторизованных, ответы с cookies и страницы с CSRF-формой идут мимо.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not PAGE_CACHE_TIMEOUT
+                    or request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return _mark(view(request, *args, **kwargs), 'BYPASS')
+            values = page_versions(request, scopes, args, kwargs)
+            key = PAGE_KEY.format(hashlib.md5('|'.join([
+                request.get_full_path(), *map(str, values)
+            ]).encode()).hexdigest())
+            response = cache.get(key)
+            if response is not None:
+                return _mark(response, 'HIT')
+            response = view(request, *args, **kwargs)
+            if (response.status_code != 200 or response.streaming
+                    or response.cookies
+                    or request.META.get('CSRF_COOKIE_USED')):
+                return _mark(response, 'BYPASS')
+            cache.set(key, response, PAGE_CACHE_TIMEOUT)
+            return _mark(response, 'MISS')
+        return wrapper
+    return decorator
+
+
+def _mark(response, status):
+    response[PAGE_CACHE_HEADER] = status
+    return response
+
+
+def bump(*scopes):
+    now = _now()
+    cache.set_many(
+        {VERSION_KEY.format(scope): now for scope in scopes}, None
+    )
+
+
+def post_changed(post, old_group_id=None):
+    scopes = {ALL_POSTS, AUTHOR.format(post.author_id), POST.format(post.id)}
+    for group_id in (post.group_id, old_group_id):
+        if group_id:
+            scopes.update((GROUP.format(group_id), GROUPS))
+    bump(*scopes)
+
+
+def comment_changed(comment):
+    bump(POST.format(comment.post_id))
+
+
+def follow_changed(follow):
+    bump(
+        FOLLOW.format(follow.user_id),
+        AUTHOR.format(follow.user_id),
+        AUTHOR.format(follow.author_id),
+    )
+
+
+def group_changed(group):
+    """Название группы выводится у каждого её поста и в профилях авторов."""
+    scopes = {ALL_POSTS, GROUPS, GROUP.format(group.id)}
+    for author_id, post_id in group.posts.values_list(
+        'author_id', 'id'
+    ).iterator():
+        scopes.update((AUTHOR.format(author_id), POST.format(post_id)))
+    bump(*scopes)
+
+
+def user_changed(user):
+    """Имя автора выводится у его постов, в том числе на страницах групп."""
+    scopes = {ALL_POSTS, AUTHOR.format(user.id)}
+    for group_id in user.posts.filter(group__isnull=False).values_list(
+        'group_id', flat=True
+    ).distinct():
+        scopes.add(GROUP.format(group_id))
+    bump(*scopes)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Кэши, которые не видны другим процессам.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache(app_configs, **kwargs):
+    """Версии областей (posts.caching) живут в кэше по умолчанию.
+
+    В кэше процесса bump() одного воркера не видят остальные: они отдают
+    старые фрагменты и страницы и отвечают 304 по устаревшим ETag.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f'Кэш по умолчанию {backend} не общий для воркеров, версии '
+        f'областей кэширования в нём расходятся между процессами.',
+        hint='Задайте YATUBE_CACHE=redis или YATUBE_CACHE=memcached.',
+        id='posts.E001',
+    )]
@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Counter, Follow, Group, Post, UserStats
+
+
+def get_count(scope, object_id, queryset):
+    value = Counter.objects.filter(
+        scope=scope, object_id=object_id
+    ).values_list('value', flat=True).first()
+    if value is not None:
+        return value
+    # Строка появляется до подсчёта и в той же транзакции: пост,
+    # добавленный после COUNT, прибавится к ней через F() + 1, а не
+    # потеряется, пока строки ещё нет.
+    with transaction.atomic():
+        counter, created = Counter.objects.select_for_update().get_or_create(
+            scope=scope, object_id=object_id, defaults={'value': 0}
+        )
+        if not created:
+            return counter.value
+        Counter.objects.filter(pk=counter.pk).update(
+            value=F('value') + queryset.count()
+        )
+        return Counter.objects.values_list('value', flat=True).get(
+            pk=counter.pk
+        )
+
+
+def user_stats(user_id):
+    """Счётчики пользователя; строка заполняется при первом чтении."""
+    stats = UserStats.objects.filter(user_id=user_id).first()
+    if stats is not None:
+        return stats
+    # Как в get_count: строка появляется до подсчёта, и изменения,
+    # сделанные во время COUNT, прибавляются к ней, а не теряются.
+    with transaction.atomic():
+        stats, created = UserStats.objects.select_for_update().get_or_create(
+            user_id=user_id
+        )
+        if not created:
+            return stats
+        UserStats.objects.filter(pk=stats.pk).update(**{
+            field: F(field) + value
+            for field, value in count_user_stats(user_id).items()
+        })
+        stats.refresh_from_db()
+        return stats
+
+
+def count_user_stats(user_id):
+    return {
+        'posts': Post.objects.filter(author_id=user_id).count(),
+        'followers': Follow.objects.filter(author_id=user_id).count(),
+        'following': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def change_user_stats(user_id, **deltas):
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def change(scope, object_ids, delta):
+    Counter.objects.filter(
+        scope=scope, object_id__in=object_ids
+    ).update(value=F('value') + delta)
+
+
+def reset(scope, object_ids):
+    Counter.objects.filter(scope=scope, object_id__in=object_ids).delete()
+
+
+def post_added(post, delta=1):
+    change(Counter.ALL, [0], delta)
+    change_user_stats(post.author_id, posts=delta)
+    if post.group_id:
+        change_group(post.group_id, delta)
+    change(
+        Counter.FEED,
+        Follow.objects.filter(author_id=post.author_id).values('user_id'),
+        delta
+    )
+
+
+def post_moved(old_group_id, new_group_id):
+    if old_group_id:
+        change_group(old_group_id, -1)
+    if new_group_id:
+        change_group(new_group_id, 1)
+
+
+def group_post_count():
+    return Coalesce(Subquery(
+        Post.objects.filter(group=OuterRef('pk')).order_by().values('group')
+        .annotate(count=Count('id')).values('count')
+    ), 0)
+
+
+def last_post_at():
+    # По индексу (group, -pub_date) — одна строка на группу.
+    return Subquery(
+        Post.objects.filter(group=OuterRef('pk')).order_by('-pub_date')
+        .values('pub_date')[:1]
+    )
+
+
+def group_stats(groups):
+    """Дозаполняет счётчики групп, которые ещё не считались.
+
+    Пустой ``post_count`` у новой группы заполняется при первом чтении,
+    как и остальные счётчики: посты могли попасть в неё мимо сигналов.
+    """
+    missing = [group.id for group in groups if group.post_count is None]
+    if not missing:
+        return groups
+    Group.objects.filter(pk__in=missing, post_count__isnull=True).update(
+        post_count=group_post_count(), last_post_at=last_post_at()
+    )
+    filled = Group.objects.in_bulk(missing)
+    for group in groups:
+        if group.id in filled:
+            group.post_count = filled[group.id].post_count
+            group.last_post_at = filled[group.id].last_post_at
+    return groups
+
+
+def change_group(group_id, delta):
+    # Пока счётчик пуст, NULL + delta остаётся NULL.
+    Group.objects.filter(pk=group_id).update(
+        post_count=F('post_count') + delta, last_post_at=last_post_at()
+    )
+
+
+def comment_added(comment, delta=1):
+    Post.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + delta
+    )
+
+
+def follow_added(follow, delta=1):
+    change_user_stats(follow.author_id, followers=delta)
+    change_user_stats(follow.user_id, following=delta)
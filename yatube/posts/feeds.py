@@ -0,0 +1,188 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from posts.settings import (
+    FEED_BACKFILL, FEED_BATCH_SIZE, FEED_FANOUT, FEED_FANOUT_MAX_FOLLOWERS,
+    FEED_POPULAR_AUTHORS_TTL
+)
+from . import caching, counters
+from .models import Counter, FeedEntry, Follow, PopularAuthor, Post
+from .paginator import KeysetPaginator
+
+POPULAR_AUTHORS_KEY = 'posts:feed:popular_authors'
+ENTRY_ORDERING = ('-pub_date', '-post_id')
+
+
+def popular_authors():
+    """Авторы, чьи посты не раскладываются по лентам, а читаются на лету.
+
+    Набор хранится в PopularAuthor и меняется только
+    sync_popular_authors, здесь он лишь кэшируется.
+    """
+    authors = cache.get(POPULAR_AUTHORS_KEY)
+    if authors is None:
+        authors = set(
+            PopularAuthor.objects.values_list('author_id', flat=True)
+        )
+        cache.set(POPULAR_AUTHORS_KEY, authors, FEED_POPULAR_AUTHORS_TTL)
+    return authors
+
+
+def forget_popular_authors():
+    cache.delete(POPULAR_AUTHORS_KEY)
+
+
+def update_popular_authors():
+    """Пересчитывает PopularAuthor по числу подписчиков.
+
+    Популярны авторы, у которых подписчиков больше
+    FEED_FANOUT_MAX_FOLLOWERS. Возвращает добавленных и убранных.
+    """
+    authors = set(
+        Follow.objects.values('author')
+        .annotate(followers=Count('user'))
+        .filter(followers__gt=FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list('author', flat=True)
+    )
+    known = set(PopularAuthor.objects.values_list('author_id', flat=True))
+    added, removed = authors - known, known - authors
+    PopularAuthor.objects.filter(author_id__in=removed).delete()
+    PopularAuthor.objects.bulk_create(
+        PopularAuthor(author_id=author_id) for author_id in added
+    )
+    transaction.on_commit(forget_popular_authors)
+    return added, removed
+
+
+def sync_popular_authors():
+    """Обновляет PopularAuthor и приводит к нему ленты.
+
+    У ставших популярными записи удаляются, ставшим обычными добавляются
+    последние FEED_BACKFILL постов: пока автор считался популярным, его
+    посты по лентам не раскладывались. Запускается командой
+    sync_popular_authors, а не из запросов.
+    """
+    with transaction.atomic():
+        added, removed = update_popular_authors()
+        if FEED_FANOUT:
+            for author_id in added:
+                FeedEntry.objects.filter(post__author_id=author_id).delete()
+            for author_id in removed:
+                fill(
+                    Follow.objects.filter(author_id=author_id)
+                    .values_list('user_id', flat=True).iterator(),
+                    author_id
+                )
+        followers = list(Follow.objects.filter(
+            author_id__in=added | removed
+        ).values_list('user_id', flat=True).distinct())
+        counters.reset(Counter.FEED, followers)
+    forget_popular_authors()
+    caching.bump(*(caching.FOLLOW.format(user_id) for user_id in followers))
+    return added, removed
+
+
+def pulled_authors(user):
+    popular = popular_authors()
+    if not popular:
+        return []
+    return list(Follow.objects.filter(
+        user=user, author_id__in=popular
+    ).values_list('author_id', flat=True))
+
+
+def follow_feed(user, pulled=None):
+    """Все посты ленты одним запросом: для номеров страниц и подсчёта."""
+    if not FEED_FANOUT:
+        return Post.objects.filter(author__following__user=user)
+    condition = Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+    if pulled is None:
+        pulled = pulled_authors(user)
+    if pulled:
+        condition |= Q(author_id__in=pulled)
+    return Post.objects.filter(condition)
+
+
+class FollowPaginator(KeysetPaginator):
+    """Лента подписок.
+
+    Курсорные страницы читаются по индексу ``(user, -pub_date)`` таблицы
+    FeedEntry, посты — по id. Популярных авторов в ней нет: их посты
+    подмешиваются запросом на каждого автора, не длиннее страницы.
+    """
+
+    def __init__(self, user, per_page):
+        self.user = user
+        self.pulled = pulled_authors(user) if FEED_FANOUT else []
+        super().__init__(
+            follow_feed(user, self.pulled).feed(), per_page,
+            count_scope=(Counter.FEED, user.id)
+        )
+
+    def _fetch(self, values, forward):
+        if not FEED_FANOUT:
+            return super()._fetch(values, forward)
+        limit = self.per_page + 1
+        entries = FeedEntry.objects.filter(user=self.user)
+        if values is not None:
+            entries = entries.filter(
+                self._seek(values, forward, ENTRY_ORDERING)
+            )
+        keys = list(entries.order_by(
+            *ENTRY_ORDERING if forward
+            else self._reversed_ordering(ENTRY_ORDERING)
+        ).values_list('pub_date', 'post')[:limit])
+        ordering = self.ordering if forward else self._reversed_ordering()
+        for author_id in self.pulled:
+            posts = Post.objects.filter(author_id=author_id)
+            if values is not None:
+                posts = posts.filter(self._seek(values, forward))
+            keys += posts.order_by(*ordering).values_list(
+                'pub_date', 'id'
+            )[:limit]
+        # Пост популярного автора мог остаться и в FeedEntry.
+        keys = sorted(set(keys), reverse=forward)[:limit]
+        if not keys:
+            return []
+        posts = Post.objects.feed().in_bulk([post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
+
+
+def fill(user_ids, author_id):
+    """Последние FEED_BACKFILL постов автора — в ленты ``user_ids``."""
+    posts = list(Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date').values_list('id', 'pub_date')[:FEED_BACKFILL])
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post_id=post_id, pub_date=date)
+         for user_id in user_ids for post_id, date in posts),
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    if not FEED_FANOUT or post.author_id in popular_authors():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=FEED_BATCH_SIZE
+    )
+
+
+def backfill(follow):
+    if not FEED_FANOUT or follow.author_id in popular_authors():
+        return
+    fill([follow.user_id], follow.author_id)
+
+
+def evict(follow):
+    FeedEntry.objects.filter(
+        user_id=follow.user_id,
+        post__author_id=follow.author_id
+    ).delete()
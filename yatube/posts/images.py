@@ -0,0 +1,58 @@
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.core.files import File
+from PIL import Image, ImageOps
+
+from posts.settings import IMAGE_MAX_SIZE, IMAGE_QUALITY, IMAGE_SPOOL_SIZE
+
+WEB_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+ORIENTATION = 0x0112
+
+
+def normalize(upload):
+    """Уменьшает, поворачивает по EXIF и перекодирует загруженную картинку.
+
+    Картинки в пределах IMAGE_MAX_SIZE без EXIF в веб-формате и
+    анимации сохраняются как есть. JPEG декодируется сразу в уменьшенном
+    масштабе, результат пишется во временный файл, а не собирается в памяти.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if getattr(image, 'is_animated', False) or not _needs_work(image):
+            upload.seek(0)
+            return upload
+        image.draft('RGB', IMAGE_MAX_SIZE)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(IMAGE_MAX_SIZE, Image.LANCZOS)
+        output = SpooledTemporaryFile(IMAGE_SPOOL_SIZE)
+        if _has_alpha(image):
+            extension = '.png'
+            image.save(output, 'PNG', optimize=True)
+        else:
+            extension = '.jpg'
+            image.convert('RGB').save(
+                output, 'JPEG',
+                quality=IMAGE_QUALITY,
+                optimize=True,
+                progressive=True,
+                icc_profile=image.info.get('icc_profile'),
+            )
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    return File(output, name=name)
+
+
+def _needs_work(image):
+    return (
+        image.format not in WEB_FORMATS
+        or image.width > IMAGE_MAX_SIZE[0]
+        or image.height > IMAGE_MAX_SIZE[1]
+        or len(image.getexif()) > 0
+    )
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
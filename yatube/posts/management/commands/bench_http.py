@@ -0,0 +1,365 @@
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from collections import Counter as StatusCounter
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import urls
+from posts.models import Group, Post, User, UserStats
+
+ANONYMOUS = 'anon'
+AUTHORIZED = 'auth'
+# Маршруты, которые меняют данные: залогиненный клиент ходит в них
+# только с --writes.
+WRITES = {'posts:add_comment', 'posts:profile_follow',
+          'posts:profile_unfollow'}
+
+
+def percentile(timings, share):
+    """Значение по рангу из отсортированного списка."""
+    return timings[max(math.ceil(len(timings) * share) - 1, 0)]
+
+
+class Request:
+    """Запрос к WSGI-приложению в обход сети."""
+
+    def __init__(self, path, method='GET', query=None, data=None):
+        self.path = path
+        self.method = method
+        self.query = urlencode(query or {})
+        self.body = urlencode(data or {}).encode()
+
+    def __call__(self, application, cookies, headers=None):
+        environ = {
+            'REQUEST_METHOD': self.method,
+            'PATH_INFO': self.path,
+            'QUERY_STRING': self.query,
+            'HTTP_COOKIE': '; '.join(
+                f'{name}={value}' for name, value in cookies.items()
+            ),
+            'CONTENT_LENGTH': str(len(self.body)),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'wsgi.input': BytesIO(self.body),
+            **(headers or {}),
+        }
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            response['headers'] = response_headers
+
+        body = application(environ, start_response)
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return response
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный замер всех маршрутов posts через WSGI-приложение '
+        'на текущей (заполненной seed_bulk) базе: анонимно и от имени '
+        'пользователя, несколькими параллельными клиентами. Печатает '
+        'p50/p95/p99, запросов в секунду, SQL-запросов и память на запрос; '
+        'сохраняет результаты в JSON и сравнивает с прошлым замером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=4,
+                            help='Параллельных клиентов (потоков).')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на маршрут для каждого зрителя.')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--profile-requests', type=int, default=5,
+            help='Последовательных запросов для подсчёта SQL и памяти.'
+        )
+        parser.add_argument('--samples', type=int, default=20,
+                            help='Сколько разных постов, групп и авторов.')
+        parser.add_argument('--username',
+                            help='Зритель (по умолчанию — самый активный '
+                                 'автор).')
+        parser.add_argument('--routes',
+                            help='Через запятую, например posts:index.')
+        parser.add_argument('--writes', action='store_true',
+                            help='Замерять и маршруты, меняющие данные.')
+        parser.add_argument('--save', help='Записать результаты в JSON.')
+        parser.add_argument('--compare', help='JSON прошлого замера.')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.3,
+            help='Допустимый рост p95 и памяти, доля.'
+        )
+        parser.add_argument(
+            '--min-delta', type=float, default=2,
+            help='Рост p95 меньше этого числа миллисекунд не считается.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        from yatube.wsgi import application
+
+        self.application = application
+        self.random = random.Random(options['seed'])
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING(
+                'DEBUG=True: Django запоминает каждый SQL-запрос, '
+                'время ответа завышено.'
+            ))
+        viewer = self.viewer(options['username'])
+        routes = self.routes(viewer, options['samples'])
+        if options['routes']:
+            names = options['routes'].split(',')
+            unknown = set(names) - set(routes)
+            if unknown:
+                raise CommandError(f'Нет маршрутов: {", ".join(unknown)}')
+            routes = {name: routes[name] for name in names}
+        cookies = {ANONYMOUS: self.csrf({}), AUTHORIZED: self.login(viewer)}
+        results = {}
+        self.stdout.write(
+            'маршрут                  зритель  запр/с   p50, мс   p95, мс'
+            '   p99, мс  SQL   КиБ  ответы'
+        )
+        for name, requests in routes.items():
+            for who in (ANONYMOUS, AUTHORIZED):
+                if (who == AUTHORIZED and name in WRITES
+                        and not options['writes']):
+                    continue
+                result = self.measure(requests, cookies[who], options)
+                results[f'{name} {who}'] = result
+                self.stdout.write(
+                    f'{name:<24} {who:<7} {result["rps"]:>7.0f}'
+                    f'  {result["p50"]:>8.1f}  {result["p95"]:>8.1f}'
+                    f'  {result["p99"]:>8.1f}  {result["queries"]:>3}'
+                    f'  {result["memory"]:>4.0f}  '
+                    + ' '.join(
+                        f'{status}×{count}'
+                        for status, count in result['statuses'].items()
+                    )
+                )
+        if options['save']:
+            with open(options['save'], 'w') as file:
+                json.dump({
+                    'posts': Post.objects.count(),
+                    'clients': options['clients'],
+                    'results': results,
+                }, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(results, options)
+
+    def viewer(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            stats = UserStats.objects.order_by('-posts').first()
+            user = stats.user if stats else User.objects.first()
+        if user is None or not user.posts.exists():
+            raise CommandError(
+                'Нужна база с постами: python manage.py seed_bulk.'
+            )
+        return user
+
+    def login(self, user):
+        client = Client()
+        client.force_login(user)
+        return self.csrf({
+            settings.SESSION_COOKIE_NAME:
+                client.cookies[settings.SESSION_COOKIE_NAME].value
+        })
+
+    def csrf(self, cookies):
+        """Добавляет CSRF-cookie, как у зрителя, уже видевшего форму."""
+        response = Request(reverse('users:login'))(self.application, cookies)
+        for header, value in response['headers']:
+            cookie = SimpleCookie(value) if header == 'Set-Cookie' else {}
+            if settings.CSRF_COOKIE_NAME in cookie:
+                cookies[settings.CSRF_COOKIE_NAME] = (
+                    cookie[settings.CSRF_COOKIE_NAME].value
+                )
+        return cookies
+
+    def sample(self, queryset, field, count):
+        """Случайные значения поля: пробы по id, без ORDER BY RANDOM()."""
+        last = queryset.aggregate(last=Max('pk'))['last']
+        if last is None:
+            return []
+        found = set()
+        for _ in range(count * 3):
+            value = queryset.filter(
+                pk__gte=self.random.randint(1, last)
+            ).order_by('pk').values_list(field, flat=True).first()
+            if value is not None:
+                found.add(value)
+            if len(found) >= count:
+                break
+        return sorted(found)
+
+    def routes(self, viewer, samples):
+        """Запросы для каждого маршрута posts/urls.py."""
+        posts = self.sample(Post.objects.all(), 'pk', samples)
+        own_posts = self.sample(viewer.posts.all(), 'pk', samples)
+        groups = self.sample(Group.objects.all(), 'slug', samples)
+        authors = self.sample(
+            User.objects.exclude(pk=viewer.pk).filter(posts__isnull=False),
+            'username', samples
+        )
+        words = [
+            text.split()[0] for text in
+            Post.objects.filter(pk__in=posts).values_list('text', flat=True)
+            if text.split()
+        ]
+
+        def each(name, values, **request):
+            return [
+                Request(reverse(name, args=[value]), **request)
+                for value in values
+            ]
+
+        routes = {
+            'posts:index': [Request(reverse('posts:index'))],
+            'posts:popular': [Request(reverse('posts:popular'))],
+            'posts:group_index': [Request(reverse('posts:group_index'))],
+            'posts:group_list': each('posts:group_list', groups),
+            'posts:profile': each('posts:profile', authors),
+            'posts:post_detail': each('posts:post_detail', posts),
+            'posts:post_comments': each('posts:post_comments', posts),
+            'posts:search': [
+                Request(reverse('posts:search'), query={'q': word})
+                for word in words
+            ],
+            'posts:post_create': [Request(reverse('posts:post_create'))],
+            'posts:post_edit': each('posts:post_edit', own_posts),
+            'posts:add_comment': each(
+                'posts:add_comment', posts, method='POST',
+                data={'text': 'Замер'}
+            ),
+            'posts:follow_index': [Request(reverse('posts:follow_index'))],
+            'posts:profile_follow': each('posts:profile_follow', authors),
+            'posts:profile_unfollow': each(
+                'posts:profile_unfollow', authors
+            ),
+        }
+        missing = {
+            f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns
+        } - set(routes)
+        if missing:
+            raise CommandError(
+                f'Замер не знает маршрутов: {", ".join(sorted(missing))}'
+            )
+        return {name: found for name, found in routes.items() if found}
+
+    def send(self, request, cookies):
+        headers = {}
+        if request.method == 'POST' and settings.CSRF_COOKIE_NAME in cookies:
+            headers['HTTP_X_CSRFTOKEN'] = cookies[settings.CSRF_COOKIE_NAME]
+        return request(self.application, cookies, headers)['status']
+
+    def measure(self, requests, cookies, options):
+        for i in range(options['warmup']):
+            self.send(requests[i % len(requests)], cookies)
+        queries, memory = [], []
+        tracemalloc.start()
+        try:
+            for i in range(options['profile_requests']):
+                request = requests[i % len(requests)]
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                with CaptureQueriesContext(connection) as captured:
+                    self.send(request, cookies)
+                memory.append(
+                    (tracemalloc.get_traced_memory()[1] - before) / 1024
+                )
+                queries.append(len(captured))
+        finally:
+            tracemalloc.stop()
+        clients = max(options['clients'], 1)
+        per_client = max(options['requests'] // clients, 1)
+
+        def client(number):
+            timings, statuses = [], StatusCounter()
+            try:
+                for i in range(per_client):
+                    request = requests[(number + i * clients) % len(requests)]
+                    started = time.perf_counter()
+                    statuses[self.send(request, cookies)] += 1
+                    timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                if clients > 1:
+                    connection.close()
+            return timings, statuses
+
+        started = time.perf_counter()
+        if clients == 1:
+            done = [client(0)]
+        else:
+            with ThreadPoolExecutor(clients) as pool:
+                done = list(pool.map(client, range(clients)))
+        elapsed = time.perf_counter() - started
+        timings = sorted(t for client_timings, _ in done
+                         for t in client_timings)
+        statuses = sum((client_statuses for _, client_statuses in done),
+                       StatusCounter())
+        return {
+            'rps': len(timings) / elapsed,
+            'p50': percentile(timings, 0.5),
+            'p95': percentile(timings, 0.95),
+            'p99': percentile(timings, 0.99),
+            'queries': max(queries, default=0),
+            'memory': statistics.median(memory) if memory else 0,
+            'statuses': {
+                str(status): count
+                for status, count in sorted(statuses.items())
+            },
+        }
+
+    def compare(self, results, options):
+        with open(options['compare']) as file:
+            baseline = json.load(file)['results']
+        tolerance = 1 + options['tolerance']
+        regressions = []
+        for key, result in results.items():
+            old = baseline.get(key)
+            if old is None:
+                continue
+            if (result['p95'] > old['p95'] * tolerance
+                    and result['p95'] - old['p95'] > options['min_delta']):
+                regressions.append(
+                    f'{key}: p95 {old["p95"]:.1f} → {result["p95"]:.1f} мс'
+                )
+            if result['queries'] > old['queries']:
+                regressions.append(
+                    f'{key}: SQL {old["queries"]} → {result["queries"]}'
+                )
+            if (result['memory'] > old['memory'] * tolerance
+                    and result['memory'] - old['memory'] > 64):
+                regressions.append(
+                    f'{key}: память {old["memory"]:.0f} → '
+                    f'{result["memory"]:.0f} КиБ'
+                )
+            if set(result['statuses']) != set(old['statuses']):
+                regressions.append(
+                    f'{key}: ответы {old["statuses"]} → {result["statuses"]}'
+                )
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f'Регрессий: {len(regressions)}')
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
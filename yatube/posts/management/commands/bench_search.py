@@ -0,0 +1,100 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import Post, User
+from posts.search import Fts5Index, InvertedIndex, fts5_available
+from posts.seeding import Words
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по FTS5, обратному индексу и LIKE на '
+        'сгенерированных постах. Все данные откатываются в конце.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=50000,
+                            help='Размер словаря.')
+        parser.add_argument('--queries', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--backends', default='fts5,index,like',
+            help='Через запятую: fts5, index, like.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        backends = options['backends'].split(',')
+        if 'fts5' in backends and not fts5_available():
+            raise CommandError('Нужна SQLite со сборкой FTS5.')
+        self.random = random.Random(options['seed'])
+        self.words = Words(self.random, options['words'])
+        try:
+            with transaction.atomic():
+                self.run(backends, options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, backends, options):
+        started = time.perf_counter()
+        self.seed(options['posts'], options['batch_size'])
+        self.stdout.write(
+            f'Постов: {options["posts"]}, '
+            f'{time.perf_counter() - started:.1f} с'
+        )
+        # Запросы из частых слов: у них самые длинные списки постов.
+        queries = [
+            ' '.join(self.random.sample(self.words.vocabulary[:200], k))
+            for k in self.random.choices((1, 2), k=options['queries'])
+        ]
+        indexes = {'fts5': Fts5Index(), 'index': InvertedIndex()}
+        self.stdout.write('поиск     индекс, с   p50, мс   p95, мс   найдено')
+        for name in backends:
+            build = 0
+            if name in indexes:
+                started = time.perf_counter()
+                indexes[name].rebuild()
+                build = time.perf_counter() - started
+            timings = []
+            found = 0
+            for query in queries:
+                started = time.perf_counter()
+                found += self.search(name, indexes.get(name), query)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{name:<8}  {build:>9.1f}  {statistics.median(timings):>8.1f}'
+                f'  {timings[int(len(timings) * 0.95) - 1]:>8.1f}'
+                f'  {found:>8}'
+            )
+
+    def seed(self, count, batch_size):
+        author = User.objects.create(username='bench_search')
+        for start in range(0, count, batch_size):
+            Post.objects.bulk_create(
+                Post(author=author, text=self.words.text())
+                for _ in range(min(batch_size, count - start))
+            )
+
+    @staticmethod
+    def search(name, index, query):
+        """Первая страница выдачи и число найденных, как во вьюхе поиска."""
+        terms = query.split()
+        if index is not None:
+            index.ids(terms, 0, 10)
+            return index.count(terms)
+        posts = Post.objects.all()
+        for term in terms:
+            posts = posts.filter(text__icontains=term)
+        list(posts.order_by('-pub_date')[:10])
+        return posts.count()
@@ -0,0 +1,108 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import resolve, reverse
+
+from posts.models import Follow, Group, Post, User
+
+# Вьюхи обёрнуты в кэш страниц и фрагментов: из тёплого кэша они не
+# выполнили бы ни одного запроса.
+NO_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет ленты постов и печатает план каждого их SQL-запроса '
+        '(EXPLAIN QUERY PLAN для SQLite), отмечая полные просмотры таблиц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            help='Пользователь, от имени которого открывается /follow/.'
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.order_by('-pub_date').first()
+        if post is None:
+            raise CommandError('В базе нет ни одного поста.')
+        if options['username']:
+            viewer = User.objects.filter(
+                username=options['username']
+            ).first()
+        else:
+            follow = Follow.objects.select_related('user').first()
+            viewer = follow.user if follow else post.author
+        if viewer is None:
+            raise CommandError('Пользователь не найден.')
+        urls = [
+            (reverse('posts:index'), AnonymousUser()),
+            (reverse('posts:profile', args=[post.author.username]),
+             AnonymousUser()),
+            (reverse('posts:post_detail', args=[post.id]), AnonymousUser()),
+            (reverse('posts:follow_index'), viewer),
+        ]
+        group = Group.objects.filter(posts__isnull=False).first()
+        if group is not None:
+            urls.append(
+                (reverse('posts:group_list', args=[group.slug]),
+                 AnonymousUser())
+            )
+        full_scans = 0
+        for url, user in urls:
+            for sql in self.capture(url, user):
+                full_scans += self.explain(sql)
+        if full_scans:
+            self.stdout.write(self.style.WARNING(
+                f'Полных просмотров таблиц: {full_scans}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                'Полных просмотров таблиц нет.'
+            ))
+
+    def capture(self, url, user):
+        request = RequestFactory().get(url)
+        request.user = user
+        match = resolve(url)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{match.view_name} {url}'
+        ))
+        with override_settings(CACHES=NO_CACHE), \
+                CaptureQueriesContext(connection) as queries:
+            match.func(request, *match.args, **match.kwargs)
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith('SELECT')
+        ]
+        if not selects:
+            raise CommandError(f'{url}: не выполнено ни одного SELECT.')
+        return selects
+
+    def explain(self, sql):
+        prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else (
+            'EXPLAIN'
+        )
+        self.stdout.write(f'  {sql}')
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}')
+            plan = [str(row[-1]) for row in cursor.fetchall()]
+        full_scans = 0
+        for line in plan:
+            if self.is_full_scan(line):
+                full_scans += 1
+                self.stdout.write(self.style.WARNING(f'    {line}'))
+            else:
+                self.stdout.write(f'    {line}')
+        return full_scans
+
+    @staticmethod
+    def is_full_scan(line):
+        line = line.upper()
+        if line.startswith('SCAN'):
+            return 'INDEX' not in line
+        return line.startswith('SEQ SCAN')
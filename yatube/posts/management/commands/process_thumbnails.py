@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры картинок постов из очереди задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые задачи.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=2,
+            help='Пауза между проверками очереди в режиме --loop, секунды.'
+        )
+        parser.add_argument('--limit', type=int, default=100)
+
+    def handle(self, *args, **options):
+        while True:
+            done = thumbnails.run_pending(options['limit'])
+            if done:
+                self.stdout.write(f'Готово задач: {done}')
+            if not options['loop']:
+                break
+            if not done:
+                time.sleep(options['sleep'])
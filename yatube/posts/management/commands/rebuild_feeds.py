@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feeds
+from posts.models import Counter, FeedEntry, Follow
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок из таблицы подписок.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            FeedEntry.objects.all().delete()
+            Counter.objects.filter(scope=Counter.FEED).delete()
+            feeds.update_popular_authors()
+            feeds.forget_popular_authors()
+            follows = Follow.objects.all()
+            for follow in follows.iterator():
+                feeds.backfill(follow)
+        self.stdout.write(self.style.SUCCESS(
+            f'Лент пересобрано по {follows.count()} подпискам, '
+            f'записей: {FeedEntry.objects.count()}'
+        ))
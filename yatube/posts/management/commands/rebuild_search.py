@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.models import Post
+
+BACKENDS = {
+    'fts5': search.Fts5Index,
+    'inverted': search.InvertedIndex,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет поисковый индекс заново по всем постам. Нужна после '
+        'перехода на другую базу: миграция заполняет только FTS5, а посты, '
+        'сохранённые в обход сигналов, в индекс не попадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', choices=sorted(BACKENDS),
+            help='Индекс (по умолчанию тот, по которому идёт поиск).'
+        )
+
+    def handle(self, *args, **options):
+        if options['backend'] == 'fts5' and not search.fts5_available():
+            raise CommandError(
+                f'Таблицы {search.FTS_TABLE} нет: нужен SQLite со сборкой '
+                f'FTS5.'
+            )
+        index = (
+            BACKENDS[options['backend']]() if options['backend']
+            else search.backend()
+        )
+        index.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{type(index).__name__}: проиндексировано постов '
+            f'{Post.objects.count()}'
+        ))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.counters import group_post_count, last_post_at
+from posts.models import (
+    Comment, Counter, Follow, Group, Post, User, UserStats
+)
+
+
+def count_of(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def batches(queryset, size):
+    last = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last).order_by('pk')
+            .values_list('pk', flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики: комментарии постов, '
+        'статистику пользователей и групп, счётчики страниц. Работает '
+        'пачками, каждая пачка — в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        size = options['batch_size']
+        posts = 0
+        for ids in batches(Post.objects.all(), size):
+            posts += Post.objects.filter(pk__in=ids).update(
+                comment_count=count_of(Comment.objects.all(), 'post')
+            )
+        users = 0
+        for ids in batches(User.objects.all(), size):
+            # Строки обновляются на месте: удалять их нельзя, читатели
+            # увидели бы нули. Недостающие создаются перед обновлением.
+            with transaction.atomic():
+                UserStats.objects.bulk_create(
+                    [UserStats(user_id=user_id) for user_id in ids],
+                    ignore_conflicts=True
+                )
+                users += UserStats.objects.filter(user_id__in=ids).update(
+                    posts=count_of(Post.objects.all(), 'author'),
+                    followers=count_of(Follow.objects.all(), 'author'),
+                    following=count_of(Follow.objects.all(), 'user'),
+                )
+        groups = 0
+        for ids in batches(Group.objects.all(), size):
+            groups += Group.objects.filter(pk__in=ids).update(
+                post_count=group_post_count(),
+                last_post_at=last_post_at()
+            )
+        # Счётчики страниц заполнятся заново при первом показе.
+        Counter.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано постов: {posts}, пользователей: {users}, '
+            f'групп: {groups}'
+        ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинги популярных постов по новым комментариям '
+        'и подпискам с прошлой контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые события.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=10,
+            help='Пауза между проверками в режиме --loop, секунды.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        while True:
+            done = trending.run(options['batch_size'])
+            if done:
+                self.stdout.write(f'Учтено событий: {done}')
+            if not options['loop']:
+                break
+            if done < options['batch_size']:
+                time.sleep(options['sleep'])
@@ -0,0 +1,312 @@
+import random
+import time
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import caching, feeds, search
+from posts.models import (
+    Comment, Counter, FeedEntry, Follow, Group, Post, User, UserStats
+)
+from posts.seeding import Skewed, Words
+from posts.settings import (
+    FEED_BACKFILL, FEED_FANOUT, FEED_FANOUT_MAX_FOLLOWERS
+)
+
+# Кэш страниц SQLite на время заполнения, КиБ.
+SQLITE_CACHE_KB = 512 * 1024
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу сгенерированными пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных замеров. Авторы, группы '
+        'и обсуждаемые посты распределены по Ципфу. Строки вставляются '
+        'пачками, каждая пачка в своей транзакции; денормализованные '
+        'счётчики, ленты и поисковый индекс заполняются сразу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument(
+            '--group-share', type=float, default=0.7,
+            help='Доля постов, опубликованных в группах.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней опубликованы посты.'
+        )
+        parser.add_argument(
+            '--password',
+            help='Пароль всех пользователей; без него войти нельзя.'
+        )
+        parser.add_argument('--batch-size', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--no-search', action='store_true',
+            help='Не пересобирать поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if users < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        if options['follows'] > users * (users - 1) // 2:
+            raise CommandError(
+                'Подписок не может быть больше половины пар пользователей.'
+            )
+        self.random = random.Random(options['seed'])
+        self.words = Words(self.random, 20000)
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.start = self.now - timedelta(days=options['days'])
+        self.posts = options['posts']
+        if connection.vendor == 'sqlite':
+            # Индексы больших таблиц должны помещаться в кэш страниц,
+            # иначе каждая вставка читает их с диска.
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KB}')
+        started = time.perf_counter()
+        total = 0
+        for name, rows in (
+            ('Пользователи', self.seed_users(users, options['password'])),
+            ('Группы', self.seed_groups(options['groups'])),
+            ('Посты', self.seed_posts(
+                options['comments'], options['group_share']
+            )),
+            ('Комментарии', self.seed_comments()),
+            ('Подписки', self.seed_follows(options['follows'])),
+            ('Счётчики', self.seed_stats()),
+            ('Ленты', self.seed_feeds()),
+        ):
+            total += self.report(name, rows)
+        self.finish(options['no_search'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего строк: {total} за {elapsed:.1f} с'
+        ))
+
+    def report(self, name, rows):
+        # rows — генератор: стадия выполняется здесь и отдаёт число строк.
+        started = time.perf_counter()
+        count = sum(rows)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(
+            f'{name}: {count} за {elapsed:.1f} с, '
+            f'{count / elapsed:.0f} строк/с'
+        )
+        return count
+
+    def insert(self, model, fields, rows):
+        """Вставляет кортежи значений ``fields`` пачками.
+
+        Миллионы строк: без экземпляров моделей, через executemany —
+        bulk_create тратит большую часть времени на сборку SQL.
+        """
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            connection.ops.quote_name(model._meta.db_table),
+            ', '.join(
+                connection.ops.quote_name(model._meta.get_field(name).column)
+                for name in fields
+            ),
+            ', '.join(['%s'] * len(fields))
+        )
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            yield len(batch)
+
+    def post_date(self, index):
+        # Посты идут равномерно по времени, id растёт вместе с датой.
+        return self.start + (self.now - self.start) * (index + 1) / self.posts
+
+    @staticmethod
+    def date(value):
+        return connection.ops.adapt_datetimefield_value(value)
+
+    def seed_users(self, count, password):
+        self.users = count
+        self.user_base = next_id(User)
+        password = make_password(password)
+        joined = self.date(self.start)
+        yield from self.insert(User, (
+            'id', 'username', 'password', 'first_name', 'last_name', 'email',
+            'is_superuser', 'is_staff', 'is_active', 'date_joined'
+        ), (
+            (self.user_base + i, f'seed{self.user_base + i}', password,
+             '', '', '', False, False, True, joined)
+            for i in range(count)
+        ))
+
+    def seed_groups(self, count):
+        self.groups = count
+        self.group_base = next_id(Group)
+        yield from self.insert(Group, ('id', 'title', 'slug', 'description'), (
+            (self.group_base + i, self.words.text(1, 3).capitalize(),
+             f'seed-{self.group_base + i}', self.words.text(10, 30))
+            for i in range(count)
+        ))
+
+    def seed_posts(self, comments, group_share):
+        self.post_base = next_id(Post)
+        # Сначала решаем, сколько комментариев достанется каждому посту:
+        # comment_count пишется вместе с постом.
+        self.comment_counts = array('I', [0]) * self.posts
+        if self.posts:
+            hot = Skewed(self.random, self.posts)
+            for _ in range(comments):
+                self.comment_counts[hot()] += 1
+        self.post_authors = array('I', [0]) * self.posts
+        self.user_posts = array('I', [0]) * self.users
+        self.group_stats = [[0, None] for _ in range(self.groups)]
+        authors = Skewed(self.random, self.users)
+        groups = Skewed(self.random, self.groups) if self.groups else None
+
+        def posts():
+            for i in range(self.posts):
+                author = authors()
+                self.post_authors[i] = author
+                self.user_posts[author] += 1
+                group_id = None
+                pub_date = self.post_date(i)
+                if groups and self.random.random() < group_share:
+                    group = groups()
+                    group_id = self.group_base + group
+                    self.group_stats[group][0] += 1
+                    self.group_stats[group][1] = pub_date
+                yield (
+                    self.post_base + i, self.user_base + author, group_id,
+                    self.words.text(), self.date(pub_date), '',
+                    self.comment_counts[i]
+                )
+
+        yield from self.insert(Post, (
+            'id', 'author', 'group', 'text', 'pub_date', 'image',
+            'comment_count'
+        ), posts())
+
+    def seed_comments(self):
+        authors = Skewed(self.random, self.users)
+
+        def comments():
+            for i in range(self.posts):
+                pub_date = self.post_date(i)
+                for _ in range(self.comment_counts[i]):
+                    # Большинство комментариев — вскоре после публикации.
+                    created = pub_date + (
+                        (self.now - pub_date) * self.random.random() ** 4
+                    )
+                    yield (
+                        self.post_base + i, self.user_base + authors(),
+                        self.words.text(1, 20), self.date(created)
+                    )
+
+        yield from self.insert(
+            Comment, ('post', 'author', 'text', 'created'), comments()
+        )
+
+    def seed_follows(self, count):
+        # Подписываются все, а подписчиков набирают популярные авторы.
+        authors = Skewed(self.random, self.users)
+        pairs = set()
+        while len(pairs) < count:
+            user, author = self.random.randrange(self.users), authors()
+            if user != author:
+                pairs.add((user, author))
+        pairs = sorted(pairs)
+        self.followers = defaultdict(list)
+        self.following = array('I', [0]) * self.users
+        for user, author in pairs:
+            self.followers[author].append(user)
+            self.following[user] += 1
+        span = self.now - self.start
+        yield from self.insert(Follow, ('user', 'author', 'created'), (
+            (self.user_base + user, self.user_base + author,
+             self.date(self.start + span * self.random.random()))
+            for user, author in pairs
+        ))
+
+    def seed_stats(self):
+        yield from self.insert(
+            UserStats, ('user', 'posts', 'followers', 'following'), (
+                (self.user_base + i, self.user_posts[i],
+                 len(self.followers.get(i, ())), self.following[i])
+                for i in range(self.users)
+            )
+        )
+        Group.objects.bulk_update(
+            [
+                Group(
+                    id=self.group_base + i,
+                    post_count=post_count,
+                    last_post_at=last_post_at
+                )
+                for i, (post_count, last_post_at)
+                in enumerate(self.group_stats)
+            ],
+            ['post_count', 'last_post_at'],
+            batch_size=self.batch_size
+        )
+        yield self.groups
+
+    def seed_feeds(self):
+        """Ленты как после rebuild_feeds: последние посты каждого автора."""
+        if not FEED_FANOUT:
+            return
+        taken = array('I', [0]) * self.users
+
+        def entries():
+            for i in reversed(range(self.posts)):
+                author = self.post_authors[i]
+                followers = self.followers.get(author)
+                if (not followers or taken[author] >= FEED_BACKFILL
+                        or len(followers) > FEED_FANOUT_MAX_FOLLOWERS):
+                    continue
+                taken[author] += 1
+                post_id = self.post_base + i
+                pub_date = self.date(self.post_date(i))
+                for user in followers:
+                    yield self.user_base + user, post_id, pub_date
+
+        yield from self.insert(
+            FeedEntry, ('user', 'post', 'pub_date'), entries()
+        )
+
+    def finish(self, no_search):
+        # Явные id не двигают последовательности PostgreSQL.
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Group, Post]
+            ):
+                cursor.execute(sql)
+        Counter.objects.filter(scope=Counter.ALL).delete()
+        # Ленты уже собраны без популярных авторов, остаётся их записать.
+        with transaction.atomic():
+            feeds.update_popular_authors()
+        if not no_search:
+            started = time.perf_counter()
+            search.backend().rebuild()
+            self.stdout.write(
+                f'Поисковый индекс: {time.perf_counter() - started:.1f} с'
+            )
+        caching.bump(caching.ALL_POSTS, caching.GROUPS)
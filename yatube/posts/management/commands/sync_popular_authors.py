@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярных авторов, чьи посты читаются при запросе '
+        'ленты, и приводит к ним ленты подписок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а пересчитывать раз в --sleep секунд.'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=60 * 5,
+            help='Пауза между пересчётами в режиме --loop, секунды.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            added, removed = feeds.sync_popular_authors()
+            if added or removed:
+                self.stdout.write(
+                    f'Стали популярными: {len(added)}, '
+                    f'перестали: {len(removed)}'
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
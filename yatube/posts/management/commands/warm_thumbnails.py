@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _init_worker():
+    django.setup()
+
+
+def _warm(item):
+    post_id, image, known = item
+    try:
+        variants, generated = thumbnails.make_variants(image, known)
+    except Exception as error:
+        return post_id, image, None, 0, repr(error)
+    if not generated and variants == known:
+        # Строка Thumbnail уже такая: сохранение сбросило бы кэш поста.
+        variants = None
+    return post_id, image, variants, generated, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Готовит миниатюры всех картинок постов параллельно на всех ядрах. '
+        'Миниатюры, уже записанные в Thumbnail, пропускаются, поэтому '
+        'прерванный прогон можно просто запустить снова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=multiprocessing.cpu_count(),
+            help='Число процессов; 0 — всё в текущем процессе.'
+        )
+        parser.add_argument(
+            '--start', type=int, default=0,
+            help='Начать с поста с этим id.'
+        )
+        parser.add_argument('--chunksize', type=int, default=16)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Создать заново и готовые миниатюры, например после '
+                 'изменения THUMBNAIL_OPTIONS.'
+        )
+
+    def handle(self, *args, **options):
+        items = [
+            (post_id, image, None if options['force'] or known_image != image
+             else json.loads(variants))
+            for post_id, image, known_image, variants in
+            Post.objects.exclude(image='')
+            .filter(pk__gte=options['start'])
+            .order_by('pk')
+            .values_list('pk', 'image', 'thumbnail__image',
+                         'thumbnail__variants')
+        ]
+        started = time.perf_counter()
+        if options['workers']:
+            connections.close_all()
+            pool = multiprocessing.Pool(options['workers'], _init_worker)
+            with pool:
+                stats = self.collect(pool.imap_unordered(
+                    _warm, items, options['chunksize']
+                ))
+        else:
+            stats = self.collect(map(_warm, items))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок: {len(items)}, создано миниатюр: {stats["generated"]}, '
+            f'ошибок: {stats["failed"]}, {elapsed:.1f} с, '
+            f'{len(items) / elapsed if elapsed else 0:.1f} картинок/с'
+        ))
+
+    def collect(self, results):
+        stats = {'generated': 0, 'failed': 0}
+        for done, result in enumerate(results, 1):
+            post_id, image, variants, generated, error = result
+            if error:
+                stats['failed'] += 1
+                self.stderr.write(f'Пост {post_id} ({image}): {error}')
+                continue
+            stats['generated'] += generated
+            if variants is not None:
+                thumbnails.save_variants(post_id, image, variants)
+            if done % 100 == 0:
+                self.stdout.write(f'Обработано картинок: {done}')
+        return stats
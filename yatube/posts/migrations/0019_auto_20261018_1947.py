@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_auto_20211203_1900'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('all', 'Все посты'), ('group', 'Посты группы'), ('author', 'Посты автора'), ('feed', 'Лента подписок')], max_length=10, verbose_name='Область')),
+                ('object_id', models.PositiveIntegerField(default=0, verbose_name='Объект')),
+                ('value', models.IntegerField(default=0, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'Счётчик',
+                'verbose_name_plural': 'Счётчики',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='counter',
+            constraint=models.UniqueConstraint(fields=('scope', 'object_id'), name='uniq_counter'),
+        ),
+    ]
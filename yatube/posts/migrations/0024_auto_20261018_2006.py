@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_comment_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Counter = apps.get_model('posts', 'Counter')
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(count=Count('id')).values('count')
+    Post.objects.update(comment_count=Coalesce(Subquery(comments), 0))
+    Counter.objects.filter(scope='author').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0023_auto_20261018_2004'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts', models.IntegerField(default=0, verbose_name='Постов')),
+                ('followers', models.IntegerField(default=0, verbose_name='Подписчиков')),
+                ('following', models.IntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.AlterField(
+            model_name='counter',
+            name='scope',
+            field=models.CharField(choices=[('all', 'Все посты'), ('group', 'Посты группы'), ('feed', 'Лента подписок')], max_length=10, verbose_name='Область'),
+        ),
+        migrations.RunPython(
+            fill_comment_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:14
+
+from django.db import OperationalError, migrations
+
+FTS_TABLE = 'posts_post_fts'
+
+
+def create_fts(apps, schema_editor):
+    # Только SQLite со сборкой FTS5; иначе поиск идёт по SearchTerm.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            f"text, tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        f'INSERT INTO {FTS_TABLE} (rowid, text) '
+        f'SELECT id, text FROM posts_post'
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_auto_20261018_2014'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
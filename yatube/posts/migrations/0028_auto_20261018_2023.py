@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Counter = apps.get_model('posts', 'Counter')
+    posts = Post.objects.filter(group=OuterRef('pk')).order_by()
+    Group.objects.update(
+        post_count=Coalesce(Subquery(
+            posts.values('group').annotate(count=Count('id')).values('count')
+        ), 0),
+        last_post_at=Subquery(
+            posts.order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+    Counter.objects.filter(scope='group').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_auto_20261018_2020'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='last_post_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Последний пост'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Число постов'),
+        ),
+        migrations.AlterField(
+            model_name='counter',
+            name='scope',
+            field=models.CharField(choices=[('all', 'Все посты'), ('feed', 'Лента подписок')], max_length=10, verbose_name='Область'),
+        ),
+        migrations.RunPython(
+            fill_group_stats, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+from posts.settings import FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fill_popular_authors(apps, schema_editor):
+    # Раньше набор жил только в кэше: ленты приводятся к записанному.
+    Follow = apps.get_model('posts', 'Follow')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    PopularAuthor = apps.get_model('posts', 'PopularAuthor')
+    authors = list(
+        Follow.objects.values('author')
+        .annotate(followers=Count('user'))
+        .filter(followers__gt=FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list('author', flat=True)
+    )
+    PopularAuthor.objects.bulk_create(
+        PopularAuthor(author_id=author_id) for author_id in authors
+    )
+    FeedEntry.objects.filter(post__author_id__in=authors).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0029_auto_20261018_2155'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+        migrations.RunPython(fill_popular_authors, migrations.RunPython.noop),
+    ]
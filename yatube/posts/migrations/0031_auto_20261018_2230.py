@@ -0,0 +1,94 @@
+# Generated by Django 2.2.16 on 2026-10-18 22:30
+
+from datetime import timedelta
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+from posts.settings import TRENDING_OVERLAP
+
+CHECKPOINT_EVENTS = {
+    'trending:comments': 'Comment',
+    'trending:follows': 'Follow',
+}
+
+
+def fill_checkpoint_moments(apps, schema_editor):
+    # Позиция по id превращается во время: события из окна перекрытия,
+    # учтённые до миграции, помечаются, чтобы не посчитать их дважды.
+    Checkpoint = apps.get_model('posts', 'Checkpoint')
+    CheckpointEvent = apps.get_model('posts', 'CheckpointEvent')
+    for checkpoint in Checkpoint.objects.all():
+        model = apps.get_model('posts', CHECKPOINT_EVENTS[checkpoint.name])
+        done = model.objects.filter(pk__lte=checkpoint.position)
+        last = done.order_by('-created').values_list(
+            'created', flat=True
+        ).first()
+        if last is None:
+            continue
+        checkpoint.moment = last
+        checkpoint.save(update_fields=['moment'])
+        CheckpointEvent.objects.bulk_create(
+            CheckpointEvent(checkpoint=checkpoint, event_id=pk, created=created)
+            for pk, created in done.filter(
+                created__gte=last - timedelta(seconds=TRENDING_OVERLAP)
+            ).values_list('pk', 'created').iterator()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0030_auto_20261018_2157'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата подписки'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='checkpoint',
+            name='moment',
+            field=models.DateTimeField(null=True, verbose_name='Время последнего обработанного события'),
+        ),
+        migrations.CreateModel(
+            name='CheckpointEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.PositiveIntegerField(verbose_name='Id события')),
+                ('created', models.DateTimeField(verbose_name='Время события')),
+                ('checkpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='posts.Checkpoint', verbose_name='Контрольная точка')),
+            ],
+            options={
+                'verbose_name': 'Учтённое событие',
+                'verbose_name_plural': 'Учтённые события',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='checkpointevent',
+            index=models.Index(fields=['checkpoint', 'created'], name='checkpoint_event_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='checkpointevent',
+            constraint=models.UniqueConstraint(fields=('checkpoint', 'event_id'), name='uniq_checkpoint_event'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['created', 'id'], name='comment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['created', 'id'], name='follow_created_idx'),
+        ),
+        migrations.RunPython(
+            fill_checkpoint_moments, migrations.RunPython.noop
+        ),
+        migrations.RemoveField(
+            model_name='checkpoint',
+            name='position',
+        ),
+    ]
@@ -1,3 +1,6 @@
+import json
+
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -11,6 +14,18 @@ class Group(models.Model):
     )
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    post_count = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Число постов'
+    )
+    last_post_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Последний пост'
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -21,6 +36,11 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        return self.select_related('author', 'group', 'thumbnail')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -52,9 +72,30 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_date_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -64,6 +105,16 @@ class Post(models.Model):
     def __repr__(self):
         return f'<Post: {self.text}>'
 
+    @property
+    def variants(self):
+        try:
+            thumbnail = self.thumbnail
+        except ObjectDoesNotExist:
+            return {}
+        if thumbnail.image != self.image.name:
+            return {}
+        return thumbnail.get_variants()
+
 
 class Comment(models.Model):
     text = models.TextField(
@@ -89,6 +140,16 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+            models.Index(
+                fields=['created', 'id'],
+                name='comment_created_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -109,6 +170,10 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор поста',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата подписки'
+    )
 
     class Meta:
         constraints = [
@@ -117,6 +182,16 @@ class Follow(models.Model):
                 name='uniq_followers'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+            models.Index(
+                fields=['created', 'id'],
+                name='follow_created_idx'
+            ),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
 
@@ -125,3 +200,309 @@ class Follow(models.Model):
             f'author: {self.author}',
             f'user: {self.user}'
         )
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='uniq_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_entry_user_date_idx'
+            )
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class PopularAuthor(models.Model):
+    """Автор, чьи посты не раскладываются по лентам, а читаются на лету."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        return str(self.author_id)
+
+
+class Counter(models.Model):
+    ALL = 'all'
+    FEED = 'feed'
+    SCOPES = (
+        (ALL, 'Все посты'),
+        (FEED, 'Лента подписок'),
+    )
+
+    scope = models.CharField(
+        max_length=10,
+        choices=SCOPES,
+        verbose_name='Область'
+    )
+    object_id = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Объект'
+    )
+    value = models.IntegerField(
+        default=0,
+        verbose_name='Количество постов'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'object_id'],
+                name='uniq_counter'
+            )
+        ]
+        verbose_name = 'Счётчик'
+        verbose_name_plural = 'Счётчики'
+
+    def __str__(self):
+        return f'{self.scope}:{self.object_id}={self.value}'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts = models.IntegerField(
+        default=0,
+        verbose_name='Постов'
+    )
+    followers = models.IntegerField(
+        default=0,
+        verbose_name='Подписчиков'
+    )
+    following = models.IntegerField(
+        default=0,
+        verbose_name='Подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return (
+            f'{self.user_id}: {self.posts} / '
+            f'{self.followers} / {self.following}'
+        )
+
+
+class SearchTerm(models.Model):
+    term = models.CharField(
+        max_length=64,
+        verbose_name='Слово'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    count = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Вхождений'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='uniq_search_term'
+            )
+        ]
+        verbose_name = 'Слово поиска'
+        verbose_name_plural = 'Слова поиска'
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
+
+
+class PostScore(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Пост'
+    )
+    # log2 суммы весов событий, каждый вес умножен на 2^(t / полураспад):
+    # порядок по этому числу совпадает с порядком по затухшему рейтингу.
+    score = models.FloatField(
+        verbose_name='Рейтинг'
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='post_score_idx'),
+        ]
+        verbose_name = 'Рейтинг поста'
+        verbose_name_plural = 'Рейтинги постов'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.score}'
+
+
+class Checkpoint(models.Model):
+    name = models.CharField(
+        max_length=32,
+        primary_key=True,
+        verbose_name='Обработчик'
+    )
+    moment = models.DateTimeField(
+        null=True,
+        verbose_name='Время последнего обработанного события'
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка'
+        verbose_name_plural = 'Контрольные точки'
+
+    def __str__(self):
+        return f'{self.name}: {self.moment}'
+
+
+class CheckpointEvent(models.Model):
+    checkpoint = models.ForeignKey(
+        Checkpoint,
+        on_delete=models.CASCADE,
+        related_name='events',
+        verbose_name='Контрольная точка'
+    )
+    event_id = models.PositiveIntegerField(verbose_name='Id события')
+    created = models.DateTimeField(verbose_name='Время события')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['checkpoint', 'event_id'],
+                name='uniq_checkpoint_event'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['checkpoint', 'created'],
+                name='checkpoint_event_created_idx'
+            ),
+        ]
+        verbose_name = 'Учтённое событие'
+        verbose_name_plural = 'Учтённые события'
+
+    def __str__(self):
+        return f'{self.checkpoint_id}: {self.event_id}'
+
+
+class Thumbnail(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail',
+        verbose_name='Пост'
+    )
+    image = models.CharField(
+        max_length=100,
+        verbose_name='Исходная картинка'
+    )
+    variants = models.TextField(
+        default='{}',
+        verbose_name='Варианты'
+    )
+
+    class Meta:
+        verbose_name = 'Миниатюры'
+        verbose_name_plural = 'Миниатюры'
+
+    def __str__(self):
+        return self.image
+
+    def get_variants(self):
+        if not hasattr(self, '_variants'):
+            self._variants = json.loads(self.variants)
+        return self._variants
+
+
+class ThumbnailJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnail_jobs',
+        verbose_name='Пост'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создано'
+    )
+    updated = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        ordering = ('created',)
+        indexes = [
+            models.Index(
+                fields=['status', 'created'],
+                name='thumbnail_job_status_idx'
+            ),
+        ]
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
+
+    def __str__(self):
+        return f'{self.post_id}: {self.status}'
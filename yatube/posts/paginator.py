@@ -0,0 +1,136 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .counters import get_count
+
+CURSOR_SALT = 'posts.paginator.cursor'
+FORWARD = 'next'
+BACKWARD = 'previous'
+
+
+class KeysetPaginator(Paginator):
+    """Paginator that can also seek by an opaque ``cursor`` token.
+
+    Numbered pages (``?page=N``) keep working through the usual offset
+    queries for old links, but every page also carries ``next_cursor``
+    and ``previous_cursor`` that point to its neighbours by the ordering
+    key, so following them costs the same on any depth. A cursor that
+    does not unsign leads to ``first_page``, which counts nothing.
+
+    With ``count_scope`` set to a ``(scope, object_id)`` pair the total
+    is read from the ``Counter`` table instead of ``COUNT(*)``; a total
+    that is already known can be passed as ``count``.
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=('-pub_date', '-id'), count_scope=None,
+                 count=None, **kwargs):
+        self.ordering = ordering
+        self.count_scope = count_scope
+        if count is not None:
+            self.count = count
+        super().__init__(
+            object_list.order_by(*ordering), per_page, **kwargs
+        )
+
+    @cached_property
+    def count(self):
+        if self.count_scope is None:
+            return super().count
+        return get_count(*self.count_scope, self.object_list)
+
+    def page(self, number):
+        page = super().page(number)
+        page.object_list = list(page.object_list)
+        return self._with_cursors(
+            page, page.has_previous(), page.has_next()
+        )
+
+    def get_cursor_page(self, cursor):
+        try:
+            direction, values, number = signing.loads(
+                cursor, salt=CURSOR_SALT
+            )
+            values = self._to_python(values)
+            number = max(int(number), 1)
+        except (signing.BadSignature, TypeError, ValueError,
+                ValidationError):
+            return self.first_page()
+        return self._seek_page(values, direction == FORWARD, number)
+
+    def first_page(self):
+        """Return the first page without counting the whole list."""
+        return self._seek_page(None, True, 1)
+
+    def _seek_page(self, values, forward, number):
+        rows = self._fetch(values, forward)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+        page = self._get_page(rows, number, self)
+        if forward:
+            return self._with_cursors(page, values is not None, has_more)
+        return self._with_cursors(page, has_more, True)
+
+    def _fetch(self, values, forward):
+        """Up to ``per_page + 1`` rows past ``values`` in key order."""
+        ordering = self.ordering if forward else self._reversed_ordering()
+        rows = self.object_list
+        if values is not None:
+            rows = rows.filter(self._seek(values, forward))
+        return list(rows.order_by(*ordering)[:self.per_page + 1])
+
+    def encode_cursor(self, obj, direction, number):
+        values = [
+            str(getattr(obj, name.lstrip('-'))) for name in self.ordering
+        ]
+        return signing.dumps([direction, values, number], salt=CURSOR_SALT)
+
+    def _with_cursors(self, page, has_previous, has_next):
+        rows = page.object_list
+        page.previous_cursor = page.next_cursor = None
+        if rows and has_previous:
+            page.previous_cursor = self.encode_cursor(
+                rows[0], BACKWARD, page.number - 1
+            )
+        if rows and has_next:
+            page.next_cursor = self.encode_cursor(
+                rows[-1], FORWARD, page.number + 1
+            )
+        return page
+
+    def _to_python(self, values):
+        model = self.object_list.model
+        if len(values) != len(self.ordering):
+            raise ValueError('Cursor does not match ordering.')
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(self.ordering, values)
+        ]
+
+    def _reversed_ordering(self, ordering=None):
+        return tuple(
+            name[1:] if name.startswith('-') else f'-{name}'
+            for name in ordering or self.ordering
+        )
+
+    def _seek(self, values, forward, ordering=None):
+        # ``ordering`` names the same key on another model.
+        condition = Q()
+        equal = {}
+        bound = None
+        for name, value in zip(ordering or self.ordering, values):
+            field = name.lstrip('-')
+            descending = name.startswith('-') == forward
+            lookup = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            if bound is None:
+                # Redundant range on the leading column lets the database
+                # seek the index instead of filtering from its start.
+                bound = Q(**{f'{field}__{lookup}e': value})
+            equal[field] = value
+        return condition & bound
@@ -0,0 +1,179 @@
+import math
+import re
+from collections import Counter as TermCounter
+
+from django.db import connection
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models import Case, Value, When
+
+from posts.settings import SEARCH_MAX_TERMS, SEARCH_TERM_LENGTH
+from .counters import get_count
+from .models import Counter, Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [
+        token.casefold()[:SEARCH_TERM_LENGTH]
+        for token in TOKEN.findall(text)
+    ]
+
+
+class Fts5Index:
+    """Полнотекстовый индекс SQLite FTS5, ранжирование по bm25."""
+
+    def index(self, post):
+        self.remove(post.id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.id, post.text]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s', [self.match(terms)]
+            )
+            return cursor.fetchone()[0]
+
+    def ids(self, terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s OFFSET %s',
+                [self.match(terms), limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def match(terms):
+        # Каждое слово в кавычках: синтаксис FTS5 из запроса не работает.
+        return ' '.join(f'"{term}"' for term in terms)
+
+
+class InvertedIndex:
+    """Обратный индекс в таблице SearchTerm, ранжирование по tf-idf.
+
+    Слова выделяются в Python, поэтому работает на любой базе.
+    """
+
+    def index(self, post):
+        self.remove(post.id)
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post_id, count=count)
+            for term, post_id, count in self.terms_of(post.id, post.text)
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def rebuild(self, batch_size=10000):
+        # Миллионы строк: без экземпляров моделей, пачками через executemany.
+        SearchTerm.objects.all().delete()
+        sql = (
+            f'INSERT INTO {SearchTerm._meta.db_table} (term, post_id, count) '
+            f'VALUES (%s, %s, %s)'
+        )
+        batch = []
+        posts = Post.objects.values_list('id', 'text').iterator()
+        with connection.cursor() as cursor:
+            for post_id, text in posts:
+                batch.extend(self.terms_of(post_id, text))
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    batch = []
+            cursor.executemany(sql, batch)
+
+    @staticmethod
+    def terms_of(post_id, text):
+        return [
+            (term, post_id, count)
+            for term, count in TermCounter(tokenize(text)).items()
+        ]
+
+    def count(self, terms):
+        return self.matches(terms).count()
+
+    def ids(self, terms, offset, limit):
+        frequencies = dict(
+            SearchTerm.objects.filter(term__in=terms)
+            .values_list('term').annotate(Count('id'))
+        )
+        total = max(get_count(Counter.ALL, 0, Post.objects.all()), 1)
+        score = Sum(Case(
+            *(
+                When(term=term, then=ExpressionWrapper(
+                    F('count') * Value(math.log(1 + total / frequency)),
+                    output_field=FloatField()
+                ))
+                for term, frequency in frequencies.items()
+            ),
+            output_field=FloatField()
+        ))
+        return list(
+            self.matches(terms).annotate(score=score)
+            .order_by('-score', '-post')
+            .values_list('post', flat=True)[offset:offset + limit]
+        )
+
+    @staticmethod
+    def matches(terms):
+        return SearchTerm.objects.filter(term__in=terms).values(
+            'post'
+        ).annotate(matched=Count('id')).filter(matched=len(terms))
+
+
+def fts5_available():
+    return (
+        connection.vendor == 'sqlite'
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+
+
+_backend = None
+
+
+def backend():
+    global _backend
+    if _backend is None:
+        _backend = Fts5Index() if fts5_available() else InvertedIndex()
+    return _backend
+
+
+class SearchResults:
+    """Ленивая выдача поиска для Paginator: посты режутся по страницам."""
+
+    def __init__(self, query, index=None):
+        self.terms = list(dict.fromkeys(tokenize(query)))[:SEARCH_MAX_TERMS]
+        self.index = index or backend()
+
+    def count(self):
+        return self.index.count(self.terms) if self.terms else 0
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if not self.terms:
+            return []
+        ids = self.index.ids(self.terms, item.start, item.stop - item.start)
+        posts = Post.objects.feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
@@ -0,0 +1,54 @@
+import math
+from itertools import accumulate
+
+SYLLABLES = [
+    'ка', 'ло', 'ми', 'ра', 'ту', 'не', 'по', 'си', 'да', 'ве',
+    'жи', 'зо', 'бу', 'фе', 'ха', 'чу', 'ше', 'ю', 'гра', 'сто',
+]
+STREAM_SIZE = 1000000
+
+
+class Words:
+    """Словарь из слогов; частоты слов — по Ципфу, как в живых текстах."""
+
+    def __init__(self, random, size):
+        self.random = random
+        self.vocabulary = sorted({
+            ''.join(random.choices(SYLLABLES, k=length))
+            for length in random.choices((2, 3, 4), k=size)
+        })
+        random.shuffle(self.vocabulary)
+        # Тексты режутся из заранее выбранного потока слов: choices на
+        # каждый текст заметно медленнее вставки строки в базу.
+        self.stream = random.choices(
+            self.vocabulary, cum_weights=list(accumulate(
+                1 / rank for rank in range(1, len(self.vocabulary) + 1)
+            )), k=STREAM_SIZE
+        )
+
+    def text(self, low=5, high=60):
+        start = self.random.randrange(STREAM_SIZE - high)
+        return ' '.join(
+            self.stream[start:start + self.random.randint(low, high)]
+        )
+
+
+class Skewed:
+    """Случайный номер от 0 до ``count - 1`` по закону Ципфа.
+
+    Вероятность ранга r пропорциональна 1/r, память не нужна. Ранги
+    перемешиваются умножением на взаимно простое с ``count`` число, чтобы
+    популярные объекты не шли подряд.
+    """
+
+    def __init__(self, random, count):
+        self.random = random
+        self.count = count
+        self.stride = next(
+            step for step in range(int(count * 0.618) | 1, 2 * count + 2)
+            if math.gcd(step, count) == 1
+        )
+
+    def __call__(self):
+        rank = int((self.count + 1) ** self.random.random()) - 1
+        return rank * self.stride % self.count
@@ -1 +1,55 @@
+import os
+
 POSTS_ON_PAGE = 10
+COMMENTS_ON_PAGE = 20
+GROUPS_ON_PAGE = 100
+# Поиск: сколько слов запроса учитывать и до какой длины обрезать слово.
+SEARCH_MAX_TERMS = 8
+SEARCH_TERM_LENGTH = 64
+# Лента подписок: при публикации пост раскладывается по лентам подписчиков.
+FEED_FANOUT = True
+# Посты авторов с большим числом подписчиков читаются при запросе ленты;
+# набор пересчитывает sync_popular_authors, процессы кэшируют его на
+# FEED_POPULAR_AUTHORS_TTL секунд.
+FEED_FANOUT_MAX_FOLLOWERS = 1000
+FEED_POPULAR_AUTHORS_TTL = 60 * 5
+# Сколько последних постов автора добавить в ленту при подписке; более
+# старые посты в ленту не попадают.
+FEED_BACKFILL = 100
+FEED_BATCH_SIZE = 500
+# Популярное: события затухают вдвое за TRENDING_HALF_LIFE секунд.
+TRENDING_HALF_LIFE = 60 * 60 * 24
+TRENDING_COMMENT_WEIGHT = 1.0
+TRENDING_FOLLOW_WEIGHT = 3.0
+TRENDING_BATCH_SIZE = 1000
+# События перечитываются за последние TRENDING_OVERLAP секунд: id на
+# PostgreSQL фиксируются не по порядку, а транзакция дольше окна
+# потеряет свои события.
+TRENDING_OVERLAP = 60 * 5
+TRENDING_TOP = 20
+# Кэш целых страниц для анонимов; 0 — выключен. Результат пишется
+# в заголовок PAGE_CACHE_HEADER: HIT, MISS или BYPASS.
+PAGE_CACHE_TIMEOUT = int(os.environ.get('YATUBE_PAGE_CACHE_TIMEOUT', 60 * 60))
+PAGE_CACHE_HEADER = 'X-Page-Cache'
+# Адаптивная картинка поста: ширины и пропорции вариантов, параметры
+# sorl-thumbnail и форматы. Форматы, которые установленный Pillow не умеет
+# сохранять, пропускаются; последний формат идёт в <img>, остальные —
+# в <source> тега <picture>.
+THUMBNAIL_WIDTHS = (480, 960, 1440)
+THUMBNAIL_RATIO = (960, 339)
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+THUMBNAIL_DEFAULT_WIDTH = 960
+THUMBNAIL_SIZES = '(max-width: 1000px) 100vw, 960px'
+# Потоки, которые готовят миниатюры сразу после сохранения поста;
+# 0 — только через `manage.py process_thumbnails --loop`.
+THUMBNAIL_WORKERS = int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 0))
+THUMBNAIL_MAX_ATTEMPTS = 3
+# Задача, которая выполняется дольше, считается брошенной упавшим
+# воркером, и run_pending забирает её снова.
+THUMBNAIL_JOB_TIMEOUT = 60 * 10
+# Загруженные картинки больше этого размера уменьшаются при сохранении.
+IMAGE_MAX_SIZE = (1920, 1920)
+IMAGE_QUALITY = 85
+# Картинки в памяти до этого размера, дальше — во временном файле.
+IMAGE_SPOOL_SIZE = 2 * 1024 * 1024
@@ -0,0 +1,92 @@
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete
+)
+from django.dispatch import receiver
+
+from . import caching, counters, feeds, search
+from .models import (
+    Comment, Counter, Follow, Group, Post, Thumbnail, User
+)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = instance._saved_group_id
+    if created:
+        counters.post_added(instance)
+        feeds.fan_out(instance)
+    elif instance.group_id != old_group_id:
+        counters.post_moved(old_group_id, instance.group_id)
+    caching.post_changed(instance, old_group_id)
+    search.backend().index(instance)
+    instance._saved_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_added(instance, delta=-1)
+    caching.post_changed(instance)
+    search.backend().remove(instance.id)
+
+
+@receiver(post_save, sender=Thumbnail)
+@receiver(post_delete, sender=Thumbnail)
+def thumbnail_changed(sender, instance, **kwargs):
+    # Варианты картинки выводятся везде, где виден пост.
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        caching.post_changed(post)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_added(instance)
+    caching.comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.comment_added(instance, delta=-1)
+    caching.comment_changed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_feed(sender, instance, created, **kwargs):
+    if created:
+        feeds.backfill(instance)
+        counters.follow_added(instance)
+    counters.reset(Counter.FEED, [instance.user_id])
+    caching.follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_feed(sender, instance, **kwargs):
+    feeds.evict(instance)
+    counters.follow_added(instance, delta=-1)
+    counters.reset(Counter.FEED, [instance.user_id])
+    caching.follow_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    caching.group_changed(instance)
+
+
+# До удаления: после него посты уже отвязаны от группы.
+@receiver(pre_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    caching.group_changed(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Вход в аккаунт обновляет только last_login, его нигде не выводят.
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    caching.user_changed(instance)
@@ -0,0 +1,56 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+from PIL import Image
+
+from posts.settings import THUMBNAIL_DEFAULT_WIDTH, THUMBNAIL_SIZES
+
+register = template.Library()
+
+IMG = (
+    '<img class="card-img my-2" src="{}" srcset="{}" sizes="{}" '
+    'width="{}" height="{}" loading="lazy" alt="">'
+)
+
+
+def srcset(sizes):
+    return ', '.join(
+        f'{default_storage.url(name)} {width}w' for width, _, name in sizes
+    )
+
+
+@register.simple_tag
+def post_picture(post):
+    """Картинка поста: <picture> с вариантами всех ширин и форматов.
+
+    Браузер сам выбирает формат по ``type`` у ``<source>`` и ширину по
+    ``sizes``, поэтому HTML одинаков для всех клиентов и кэшируется.
+    Пока фоновая задача не подготовила варианты, отдаётся исходная
+    картинка: на запросе страницы миниатюры не рендерятся.
+    """
+    variants = post.variants
+    if not variants:
+        return fallback(post)
+    *sources, (_, fallback_sizes) = variants.items()
+    width, height, name = min(
+        fallback_sizes,
+        key=lambda size: abs(size[0] - THUMBNAIL_DEFAULT_WIDTH)
+    )
+    return format_html(
+        '<picture>{}' + IMG + '</picture>',
+        format_html_join('', '<source type="{}" srcset="{}" sizes="{}">', (
+            (Image.MIME[fmt.upper()], srcset(sizes), THUMBNAIL_SIZES)
+            for fmt, sizes in sources
+        )),
+        default_storage.url(name), srcset(fallback_sizes), THUMBNAIL_SIZES,
+        width, height,
+    )
+
+
+def fallback(post):
+    if not post.image:
+        return ''
+    return format_html(
+        '<img class="card-img my-2" src="{}" loading="lazy" alt="">',
+        post.image.url
+    )
@@ -0,0 +1,284 @@
+import json
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import (
+    Comment, Counter, FeedEntry, Follow, Group, Post, User, UserStats
+)
+from posts.search import InvertedIndex, SearchResults
+from posts.settings import THUMBNAIL_WIDTHS
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+USERNAME = 'Maxim'
+FOLLOWER = 'follower'
+TEST_SLUG = 'test_slug'
+
+
+class ExplainFeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        Post.objects.create(author=cls.user, text='Текст', group=cls.group)
+
+    def test_explain_feeds_covers_every_feed(self):
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        output = out.getvalue()
+        for view_name in ('posts:index', 'posts:group_list', 'posts:profile',
+                          'posts:post_detail', 'posts:follow_index'):
+            with self.subTest(view_name=view_name):
+                self.assertIn(view_name, output)
+        self.assertIn('post_group_date_idx', output)
+        self.assertIn('feed_entry_user_date_idx', output)
+        self.assertNotIn('TEMP B-TREE', output)
+
+    def test_explain_feeds_bypasses_warm_cache(self):
+        self.client.get(reverse('posts:index'))
+        outputs = []
+        for _ in range(2):
+            out = StringIO()
+            call_command('explain_feeds', stdout=out)
+            outputs.append(out.getvalue())
+        index = outputs[1].split('posts:index', 1)[1].split('posts:', 1)[0]
+        self.assertIn('FROM "posts_post"', index)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class WarmThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        image = BytesIO()
+        Image.new('RGB', (1200, 800)).save(image, 'PNG')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Текст',
+            image=SimpleUploadedFile('picture.png', image.getvalue())
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def warm(self, *args, workers=0):
+        out = StringIO()
+        call_command('warm_thumbnails', *args, workers=workers, stdout=out)
+        return out.getvalue()
+
+    def test_warm_thumbnails_in_processes(self):
+        image = BytesIO()
+        Image.new('RGB', (800, 600)).save(image, 'PNG')
+        post = Post.objects.create(
+            author=self.user, text='Текст',
+            image=SimpleUploadedFile('second.png', image.getvalue())
+        )
+        count = 2 * len(thumbnails.formats()) * len(THUMBNAIL_WIDTHS)
+        self.assertIn(f'создано миниатюр: {count}', self.warm(workers=2))
+        for pk in (self.post.pk, post.pk):
+            with self.subTest(post=pk):
+                self.assertIn(
+                    'jpeg', Post.objects.feed().get(pk=pk).variants
+                )
+
+    def test_warm_thumbnails_is_resumable(self):
+        count = len(thumbnails.formats()) * len(THUMBNAIL_WIDTHS)
+        self.assertIn(f'создано миниатюр: {count}', self.warm())
+        self.assertIn(
+            'jpeg', Post.objects.feed().get(pk=self.post.pk).variants
+        )
+        with mock.patch('posts.signals.caching.post_changed') as changed:
+            self.assertIn('создано миниатюр: 0', self.warm())
+        changed.assert_not_called()
+        self.assertIn(f'создано миниатюр: {count}', self.warm('--force'))
+
+
+class RebuildSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        Post.objects.create(author=cls.user, text='Кот и собака')
+        Post.objects.bulk_create([Post(author=cls.user, text='Кот')])
+
+    def test_rebuild_search_fills_inverted_index(self):
+        out = StringIO()
+        call_command('rebuild_search', backend='inverted', stdout=out)
+        self.assertIn('InvertedIndex: проиндексировано постов 2',
+                      out.getvalue())
+        self.assertEqual(SearchResults('кот', InvertedIndex()).count(), 2)
+
+    def test_rebuild_search_uses_current_backend(self):
+        call_command('rebuild_search', stdout=StringIO())
+        self.assertEqual(SearchResults('кот').count(), 2)
+
+
+class RecountStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Текст {i}')
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.follower, text='Текст'
+        )
+
+    def test_recount_stats_repairs_counters(self):
+        Post.objects.update(comment_count=10)
+        UserStats.objects.create(user=self.user, posts=100)
+        Counter.objects.create(scope=Counter.ALL, value=100)
+        call_command('recount_stats', batch_size=2, stdout=StringIO())
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'comment_count')),
+            {self.posts[0].pk: 1, self.posts[1].pk: 0, self.posts[2].pk: 0}
+        )
+        self.assertEqual(
+            set(UserStats.objects.values_list(
+                'user', 'posts', 'followers', 'following'
+            )),
+            {(self.user.pk, 3, 1, 0), (self.follower.pk, 0, 0, 1)}
+        )
+        self.assertFalse(Counter.objects.exists())
+
+    def test_recount_stats_keeps_user_stats_rows(self):
+        UserStats.objects.create(user=self.user, posts=100)
+        with CaptureQueriesContext(connection) as queries:
+            call_command('recount_stats', stdout=StringIO())
+        self.assertFalse([
+            query['sql'] for query in queries
+            if query['sql'].startswith('DELETE')
+            and 'posts_userstats' in query['sql']
+        ])
+        self.assertEqual(UserStats.objects.get(user=self.user).posts, 3)
+
+
+class SeedBulkTests(TestCase):
+    def snapshot(self):
+        return (
+            set(UserStats.objects.values_list(
+                'user', 'posts', 'followers', 'following'
+            )),
+            set(Group.objects.values_list(
+                'pk', 'post_count', 'last_post_at'
+            )),
+            set(Post.objects.values_list('pk', 'comment_count')),
+            set(FeedEntry.objects.values_list('user', 'post', 'pub_date')),
+        )
+
+    def test_seed_bulk_fills_denormalized_data(self):
+        call_command(
+            'seed_bulk', users=20, posts=300, comments=500, follows=60,
+            groups=3, stdout=StringIO()
+        )
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 500)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertTrue(FeedEntry.objects.exists())
+        seeded = self.snapshot()
+        call_command('recount_stats', stdout=StringIO())
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.snapshot(), seeded)
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(SearchResults(word).count())
+
+    def test_seed_bulk_is_reproducible(self):
+        texts = []
+        for _ in range(2):
+            call_command(
+                'seed_bulk', users=5, posts=20, comments=0, follows=0,
+                groups=0, seed=7, stdout=StringIO()
+            )
+            texts.append(list(
+                Post.objects.order_by('-id').values_list('text', flat=True)
+                [:20]
+            ))
+        self.assertEqual(texts[0], texts[1])
+
+
+class BenchHttpTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание'
+        )
+        for author in (cls.user, cls.follower):
+            post = Post.objects.create(
+                author=author, text='Текст поста', group=group
+            )
+        Comment.objects.create(post=post, author=cls.user, text='Текст')
+
+    def setUp(self):
+        # Как тестовый клиент: соединение живёт в транзакции теста.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        handle, self.baseline = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, self.baseline)
+
+    def bench(self, **options):
+        out = StringIO()
+        call_command(
+            'bench_http', username=USERNAME, clients=1, requests=3,
+            warmup=1, profile_requests=1, samples=2, tolerance=100,
+            min_delta=10000, stdout=out, **options
+        )
+        return out.getvalue()
+
+    def test_bench_http_covers_every_route(self):
+        output = self.bench(save=self.baseline)
+        with open(self.baseline) as file:
+            results = json.load(file)['results']
+        self.assertIn('posts:index anon', results)
+        self.assertIn('posts:follow_index auth', results)
+        self.assertNotIn('posts:add_comment auth', results)
+        for key, result in results.items():
+            with self.subTest(key=key):
+                self.assertLessEqual(result['p50'], result['p99'])
+                self.assertNotIn('500', result['statuses'])
+        self.assertIn('posts:post_edit', output)
+
+    def test_bench_http_flags_regressions(self):
+        self.bench(save=self.baseline, routes='posts:index')
+        with open(self.baseline) as file:
+            baseline = json.load(file)
+        baseline['results']['posts:index auth']['queries'] -= 1
+        with open(self.baseline, 'w') as file:
+            json.dump(baseline, file)
+        with self.assertRaisesMessage(CommandError, 'Регрессий: 1'):
+            self.bench(compare=self.baseline, routes='posts:index')
@@ -0,0 +1,243 @@
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import counters
+from posts.models import (
+    Comment, Counter, Follow, Group, Post, User, UserStats
+)
+
+USERNAME = 'Maxim'
+FOLLOWER = 'follower'
+TEST_SLUG = 'test_slug'
+TEST_SLUG2 = 'test_slug2'
+TEST_TEXT = 'Тестовый пост !'
+INDEX_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', kwargs={'slug': TEST_SLUG})
+PROFILE_URL = reverse('posts:profile', kwargs={'username': USERNAME})
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+GROUP_INDEX_URL = reverse('posts:group_index')
+GROUPS = 50
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание'
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug=TEST_SLUG2,
+            description='Тестовое описание 2'
+        )
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text=TEST_TEXT,
+            group=cls.group
+        )
+        cls.follow_client = Client()
+        cls.follow_client.force_login(cls.follower)
+
+    def counts(self):
+        # Счётчики нужны только нумерованным страницам.
+        for url in (INDEX_URL, GROUP_URL, PROFILE_URL, FOLLOW_INDEX_URL):
+            self.follow_client.get(url, {'page': 1})
+        return {
+            (counter.scope, counter.object_id): counter.value
+            for counter in Counter.objects.all()
+        }
+
+    def test_counters_are_created_on_first_render(self):
+        self.assertEqual(self.counts(), {
+            (Counter.ALL, 0): 1,
+            (Counter.FEED, self.follower.id): 1,
+        })
+
+    def test_counters_follow_post_changes(self):
+        self.counts()
+        Post.objects.create(author=self.user, text=TEST_TEXT, group=self.group)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.group2
+        post.save()
+        counts = self.counts()
+        self.assertEqual(counts[(Counter.ALL, 0)], 2)
+        self.assertEqual(counts[(Counter.FEED, self.follower.id)], 2)
+        post.delete()
+        counts = self.counts()
+        self.assertEqual(counts[(Counter.ALL, 0)], 1)
+        self.assertEqual(counts[(Counter.FEED, self.follower.id)], 1)
+
+    def test_unfollow_resets_feed_counter(self):
+        self.counts()
+        Follow.objects.filter(user=self.follower).delete()
+        self.assertEqual(self.counts()[(Counter.FEED, self.follower.id)], 0)
+
+    def test_paginator_reads_counter(self):
+        self.counts()
+        Counter.objects.filter(scope=Counter.ALL).update(value=100)
+        response = self.follow_client.get(INDEX_URL, {'page': 1})
+        self.assertEqual(response.context['page_obj'].paginator.count, 100)
+
+    def test_post_added_while_counting(self):
+        author = self.user
+
+        class Racing:
+            # Пост появляется между COUNT и концом транзакции.
+            def count(self):
+                value = Post.objects.count()
+                Post.objects.create(author=author, text=TEST_TEXT)
+                return value
+
+        counters.get_count(Counter.ALL, 0, Racing())
+        self.assertEqual(
+            Counter.objects.get(scope=Counter.ALL, object_id=0).value,
+            Post.objects.count()
+        )
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.post = Post.objects.create(author=cls.user, text=TEST_TEXT)
+        cls.follow_client = Client()
+        cls.follow_client.force_login(cls.follower)
+
+    def stats(self, user):
+        return UserStats.objects.values_list(
+            'posts', 'followers', 'following'
+        ).get(user=user)
+
+    def test_stats_are_created_on_first_render(self):
+        response = self.follow_client.get(PROFILE_URL)
+        self.assertEqual(response.context['stats'].posts, 1)
+        self.assertEqual(self.stats(self.user), (1, 0, 0))
+
+    def test_stats_follow_changes(self):
+        self.follow_client.get(PROFILE_URL)
+        self.follow_client.get(
+            reverse('posts:profile', kwargs={'username': FOLLOWER})
+        )
+        self.follow_client.get(
+            reverse('posts:profile_follow', kwargs={'username': USERNAME})
+        )
+        Post.objects.create(author=self.user, text=TEST_TEXT)
+        self.assertEqual(self.stats(self.user), (2, 1, 0))
+        self.assertEqual(self.stats(self.follower), (0, 0, 1))
+        self.follow_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': USERNAME})
+        )
+        self.assertEqual(self.stats(self.user), (2, 0, 0))
+        self.assertEqual(self.stats(self.follower), (0, 0, 0))
+
+    def test_post_added_while_counting(self):
+        count_user_stats = counters.count_user_stats
+
+        def racing(user_id):
+            # Пост появляется между подсчётом и концом транзакции.
+            values = count_user_stats(user_id)
+            Post.objects.create(author=self.user, text=TEST_TEXT)
+            return values
+
+        with mock.patch('posts.counters.count_user_stats', racing):
+            counters.user_stats(self.user.id)
+        self.assertEqual(self.stats(self.user), (2, 0, 0))
+
+    def test_comment_count(self):
+        self.follow_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 1)
+        Comment.objects.get().delete()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 0)
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание'
+        )
+        cls.group2 = Group.objects.create(
+            title='Тестовая группа 2',
+            slug=TEST_SLUG2,
+            description='Тестовое описание 2'
+        )
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    def stats(self, group):
+        return Group.objects.values_list(
+            'post_count', 'last_post_at'
+        ).get(pk=group.pk)
+
+    def test_stats_follow_posts(self):
+        self.assertEqual(self.stats(self.group), (None, None))
+        self.author.get(GROUP_INDEX_URL)
+        self.assertEqual(self.stats(self.group), (0, None))
+        first = Post.objects.create(
+            author=self.user, text=TEST_TEXT, group=self.group
+        )
+        second = Post.objects.create(
+            author=self.user, text=TEST_TEXT, group=self.group
+        )
+        self.assertEqual(self.stats(self.group), (2, second.pub_date))
+        self.author.post(
+            reverse('posts:post_edit', kwargs={'post_id': second.id}),
+            {'text': TEST_TEXT, 'group': self.group2.id}
+        )
+        self.assertEqual(self.stats(self.group), (1, first.pub_date))
+        self.assertEqual(self.stats(self.group2), (1, second.pub_date))
+        Post.objects.get(pk=second.pk).delete()
+        self.assertEqual(self.stats(self.group2), (0, None))
+
+    def test_stats_are_filled_on_first_render(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=TEST_TEXT, group=self.group)
+            for _ in range(2)
+        )
+        response = self.author.get(GROUP_INDEX_URL)
+        self.assertEqual(response.context['page_obj'][0].post_count, 2)
+        self.assertEqual(self.stats(self.group)[0], 2)
+
+    def test_group_page_reads_post_count(self):
+        Post.objects.create(author=self.user, text=TEST_TEXT, group=self.group)
+        Group.objects.filter(pk=self.group.pk).update(post_count=100)
+        response = self.author.get(GROUP_URL)
+        self.assertEqual(response.context['page_obj'].paginator.count, 100)
+
+    def test_group_index(self):
+        Post.objects.create(author=self.user, text=TEST_TEXT, group=self.group)
+        response = self.author.get(GROUP_INDEX_URL)
+        self.assertEqual(
+            list(response.context['page_obj']), [self.group, self.group2]
+        )
+        self.assertContains(response, 'Постов: 1')
+        Post.objects.create(author=self.user, text=TEST_TEXT, group=self.group)
+        self.assertContains(self.author.get(GROUP_INDEX_URL), 'Постов: 2')
+
+    def test_group_index_query_budget(self):
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group-{i}', description='')
+            for i in range(GROUPS)
+        )
+        # Новые группы досчитываются при первом показе.
+        self.author.get(GROUP_INDEX_URL)
+        # Сессия, пользователь, число групп и страница групп.
+        with self.assertNumQueries(4):
+            self.author.get(GROUP_INDEX_URL)
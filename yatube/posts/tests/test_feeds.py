@@ -0,0 +1,142 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import feeds
+from posts.models import FeedEntry, Follow, PopularAuthor, Post, User
+from posts.settings import POSTS_ON_PAGE
+
+USERNAME = 'Maxim'
+FOLLOWER = 'follower'
+TEST_TEXT = 'Тестовый пост !'
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+PROFILE_FOLLOW_URL = reverse(
+    'posts:profile_follow',
+    kwargs={'username': USERNAME}
+)
+PROFILE_UNFOLLOW_URL = reverse(
+    'posts:profile_unfollow',
+    kwargs={'username': USERNAME}
+)
+
+
+class FeedFanOutTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.post = Post.objects.create(author=cls.user, text=TEST_TEXT)
+        cls.follow_client = Client()
+        cls.follow_client.force_login(cls.follower)
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self, **params):
+        return self.follow_client.get(
+            FOLLOW_INDEX_URL, params
+        ).context['page_obj']
+
+    def test_follow_backfills_and_unfollow_evicts(self):
+        self.follow_client.get(PROFILE_FOLLOW_URL)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=self.post
+        ).exists())
+        self.assertEqual(list(self.feed()), [self.post])
+        self.follow_client.get(PROFILE_UNFOLLOW_URL)
+        self.assertFalse(FeedEntry.objects.filter(user=self.follower).exists())
+        self.assertEqual(list(self.feed()), [])
+
+    def test_new_post_is_pushed_to_followers(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        post = Post.objects.create(author=self.user, text=TEST_TEXT)
+        entry = FeedEntry.objects.get(user=self.follower, post=post)
+        self.assertEqual(entry.pub_date, post.pub_date)
+        self.assertEqual(list(self.feed()), [post, self.post])
+
+    @mock.patch('posts.feeds.FEED_FANOUT_MAX_FOLLOWERS', 0)
+    def test_popular_author_is_read_on_request(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        feeds.sync_popular_authors()
+        post = Post.objects.create(author=self.user, text=TEST_TEXT)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(self.feed()), [post, self.post])
+
+    def test_rebuild_feeds(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_feeds', stdout=mock.Mock())
+        self.assertEqual(list(self.feed()), [self.post])
+
+    def test_feed_is_read_from_entries(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        FeedEntry.objects.all().delete()
+        self.assertEqual(list(self.feed()), [])
+
+    @mock.patch('posts.feeds.FEED_FANOUT_MAX_FOLLOWERS', 1)
+    def test_popular_author_is_merged_across_pages(self):
+        popular = User.objects.create_user(username='popular')
+        Follow.objects.create(user=self.follower, author=self.user)
+        Follow.objects.create(user=self.follower, author=popular)
+        Follow.objects.create(user=self.user, author=popular)
+        self.assertEqual(feeds.sync_popular_authors(), ({popular.id}, set()))
+        for _ in range(POSTS_ON_PAGE // 2 + 1):
+            Post.objects.create(author=popular, text=TEST_TEXT)
+            Post.objects.create(author=self.user, text=TEST_TEXT)
+        self.assertFalse(
+            FeedEntry.objects.filter(post__author=popular).exists()
+        )
+        expected = list(Post.objects.filter(
+            author__in=[self.user, popular]
+        ).order_by('-pub_date', '-id'))
+        first = self.feed()
+        self.assertEqual(list(first), expected[:POSTS_ON_PAGE])
+        second = self.feed(cursor=first.next_cursor)
+        self.assertEqual(list(second), expected[POSTS_ON_PAGE:])
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(
+            list(self.feed(cursor=second.previous_cursor)),
+            expected[:POSTS_ON_PAGE]
+        )
+
+    def test_author_no_longer_popular_is_backfilled(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        PopularAuthor.objects.create(author=self.user)
+        FeedEntry.objects.all().delete()
+        self.assertEqual(feeds.sync_popular_authors(), (set(), {self.user.id}))
+        self.assertFalse(PopularAuthor.objects.exists())
+        self.assertEqual(feeds.popular_authors(), set())
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.follower, post=self.post
+        ).exists())
+
+    def test_author_becoming_popular_is_evicted(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        with mock.patch('posts.feeds.FEED_FANOUT_MAX_FOLLOWERS', 0):
+            self.assertEqual(feeds.popular_authors(), set())
+            call_command('sync_popular_authors', stdout=StringIO())
+        self.assertEqual(feeds.popular_authors(), {self.user.id})
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [self.post])
+
+    @mock.patch('posts.feeds.FEED_FANOUT_MAX_FOLLOWERS', 0)
+    def test_requests_do_not_change_popular_authors(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        cache.clear()
+        self.assertEqual(list(self.feed()), [self.post])
+        self.assertFalse(PopularAuthor.objects.exists())
+        self.assertTrue(FeedEntry.objects.exists())
+
+    @mock.patch('posts.feeds.FEED_BACKFILL', 2)
+    def test_follow_backfills_latest_posts_only(self):
+        posts = [
+            Post.objects.create(author=self.user, text=TEST_TEXT)
+            for _ in range(2)
+        ]
+        self.follow_client.get(PROFILE_FOLLOW_URL)
+        self.assertEqual(list(self.feed()), posts[::-1])
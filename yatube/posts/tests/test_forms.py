@@ -1,13 +1,17 @@
 import tempfile
 import shutil
+from io import BytesIO
 
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from posts import images
 from posts.forms import PostForm
 from posts.models import Post, Group, User, Comment
+from posts.settings import IMAGE_MAX_SIZE
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -36,6 +40,9 @@ SMALL_GIF = (
     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
     b'\x0A\x00\x3B'
 )
+CAMERA_JPEG = 'camera.JPG'
+# EXIF Orientation = 6: снимок нужно повернуть на 90° по часовой стрелке.
+ROTATE_CW = 6
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -234,3 +241,26 @@ class PostFormTests(TestCase):
                 self.assertEqual(post.author, self.post.author)
                 self.assertEqual(post.text, self.post.text)
                 self.assertEqual(post.image, self.post.image)
+
+    def test_camera_image_is_normalized(self):
+        exif = Image.Exif()
+        exif[images.ORIENTATION] = ROTATE_CW
+        file = BytesIO()
+        Image.new('RGB', (4000, 3000), (10, 120, 200)).save(
+            file, 'JPEG', exif=exif.tobytes()
+        )
+        ids = set(Post.objects.all().values_list('id', flat=True))
+        self.author.post(CREATE_POST_URL, {
+            'text': 'Снимок с камеры',
+            'image': SimpleUploadedFile(
+                CAMERA_JPEG, file.getvalue(), 'image/jpeg'
+            ),
+        })
+        post = Post.objects.exclude(id__in=ids).get()
+        self.assertEqual(post.image.name, 'posts/camera.jpg')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (1440, IMAGE_MAX_SIZE[1]))
+            self.assertFalse(image.getexif())
+            self.assertTrue(image.info.get('progressive'))
+        self.assertLess(post.image.size, len(file.getvalue()))
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.feeds import popular_authors
+from posts.models import Comment, Follow, Group, Post, User
+from posts.settings import POSTS_ON_PAGE
+
+USERNAME = 'Maxim'
+FOLLOWER = 'follower'
+TEST_SLUG = 'test_slug'
+INDEX_URL = reverse('posts:index')
+GROUP_URL = reverse('posts:group_list', kwargs={'slug': TEST_SLUG})
+PROFILE_URL = reverse('posts:profile', kwargs={'username': USERNAME})
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+AUTHORS = 3
+# Запросы сессии и пользователя для авторизованного клиента.
+AUTH_QUERIES = 2
+QUERY_BUDGET = {
+    INDEX_URL: 1,
+    GROUP_URL: 2,
+    PROFILE_URL: 2,
+    FOLLOW_INDEX_URL: 2 + AUTH_QUERIES,
+}
+POST_DETAIL_BUDGET = 3
+POST_COMMENTS_BUDGET = 2
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=TEST_SLUG,
+            description='Тестовое описание'
+        )
+        authors = [cls.user] + [
+            User.objects.create_user(username=f'author{i}')
+            for i in range(AUTHORS - 1)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.follower, author=author)
+        for i in range(POSTS_ON_PAGE * 2):
+            post = Post.objects.create(
+                author=authors[i % AUTHORS],
+                text=f'Тестовый пост {i}',
+                group=cls.group
+            )
+        for author in authors:
+            Comment.objects.create(post=post, author=author, text='Текст')
+        cls.post = post
+        cls.guest = Client()
+        cls.follow_client = Client()
+        cls.follow_client.force_login(cls.follower)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feed_query_budget(self):
+        for url, budget in QUERY_BUDGET.items():
+            client = self.guest
+            if url == FOLLOW_INDEX_URL:
+                client = self.follow_client
+            client.get(url)
+            cache.clear()
+            popular_authors()
+            with self.subTest(url=url), self.assertNumQueries(budget):
+                client.get(url)
+
+    def test_post_detail_query_budget(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.guest.get(url)
+        cache.clear()
+        with self.assertNumQueries(POST_DETAIL_BUDGET):
+            self.guest.get(url)
+
+    def test_post_comments_query_budget(self):
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        with self.assertNumQueries(POST_COMMENTS_BUDGET):
+            self.guest.get(url)
+
+    def test_profile_query_budget_for_follower(self):
+        self.follow_client.get(PROFILE_URL)
+        cache.clear()
+        with self.assertNumQueries(QUERY_BUDGET[PROFILE_URL] + AUTH_QUERIES):
+            response = self.follow_client.get(PROFILE_URL)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(
+            response.context['stats'].posts,
+            Post.objects.filter(author=self.user).count()
+        )
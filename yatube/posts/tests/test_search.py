@@ -0,0 +1,96 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.paginator import Page
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.search import (
+    Fts5Index, InvertedIndex, SearchResults, fts5_available
+)
+from posts.settings import POSTS_ON_PAGE
+
+USERNAME = 'Maxim'
+SEARCH_URL = reverse('posts:search')
+QUERIES = ['кот', 'Кот собака', 'собака', 'рыба', 'кот рыба']
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+        cls.cat = Post.objects.create(author=cls.user, text='Кот кот и собака')
+        cls.dog = Post.objects.create(author=cls.user, text='Собака и кот')
+        cls.fish = Post.objects.create(author=cls.user, text='Рыба')
+
+    def search(self, query, **params):
+        response = self.guest.get(SEARCH_URL, {'q': query, **params})
+        self.assertIsInstance(response.context['page_obj'], Page)
+        return list(response.context['page_obj'])
+
+    def test_search_is_ranked(self):
+        self.assertEqual(self.search('КОТ'), [self.cat, self.dog])
+
+    def test_all_words_must_match(self):
+        self.assertEqual(self.search('рыба кот'), [])
+        self.assertEqual(
+            set(self.search('собака кот')), {self.cat, self.dog}
+        )
+
+    def test_index_follows_changes(self):
+        fish = Post.objects.get(pk=self.fish.pk)
+        fish.text = 'Кит'
+        fish.save()
+        self.assertEqual(self.search('рыба'), [])
+        self.assertEqual(self.search('кит'), [self.fish])
+        Post.objects.get(pk=self.dog.pk).delete()
+        self.assertEqual(self.search('собака'), [self.cat])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ['', '"', 'кот OR рыба', 'кот*', 'NEAR(кот)', '-']:
+            with self.subTest(query=query):
+                response = self.guest.get(SEARCH_URL, {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_results_are_paginated(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Рыба {i}')
+            for i in range(POSTS_ON_PAGE)
+        )
+        call_command('rebuild_search', stdout=StringIO())
+        self.assertEqual(len(self.search('рыба')), POSTS_ON_PAGE)
+        self.assertEqual(len(self.search('рыба', page=2)), 1)
+
+    def test_inverted_index_matches_fts(self):
+        if not fts5_available():
+            self.skipTest('SQLite собран без FTS5')
+        index = InvertedIndex()
+        index.rebuild()
+        for query in QUERIES:
+            with self.subTest(query=query):
+                results = SearchResults(query, index)
+                self.assertEqual(
+                    set(results[0:POSTS_ON_PAGE]),
+                    set(SearchResults(query, Fts5Index())[0:POSTS_ON_PAGE])
+                )
+                self.assertEqual(
+                    results.count(), SearchResults(query, Fts5Index()).count()
+                )
+        self.assertEqual(
+            SearchResults('кот', index)[0:POSTS_ON_PAGE], [self.cat, self.dog]
+        )
+
+
+class InvertedIndexSearchTests(SearchTests):
+    """Те же проверки на обратном индексе, которым ищут вне SQLite."""
+
+    def setUp(self):
+        index = InvertedIndex()
+        index.rebuild()
+        patcher = mock.patch('posts.search._backend', index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,160 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, ThumbnailJob, User
+from posts.settings import THUMBNAIL_JOB_TIMEOUT
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+USERNAME = 'Maxim'
+CREATE_POST_URL = reverse('posts:post_create')
+
+
+def image_file(name='picture.png', size=(1200, 800)):
+    file = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(file, 'PNG')
+    return SimpleUploadedFile(name, file.getvalue(), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self):
+        self.author.post(CREATE_POST_URL, {
+            'text': 'Пост с картинкой',
+            'image': image_file(),
+        })
+        return Post.objects.get()
+
+    def test_upload_enqueues_job(self):
+        post = self.create_post()
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.PENDING)
+        self.assertEqual(post.variants, {})
+
+    def test_worker_builds_variants(self):
+        post = self.create_post()
+        self.assertEqual(thumbnails.run_pending(), 1)
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        self.assertEqual(job.attempts, 1)
+        variants = Post.objects.feed().get(pk=post.pk).variants
+        self.assertEqual(
+            list(variants), [fmt.lower() for fmt in thumbnails.formats()]
+        )
+        jpeg = variants['jpeg']
+        self.assertEqual(
+            [(width, height) for width, height, _ in jpeg],
+            [(480, 170), (960, 339), (1440, 508)]
+        )
+        response = self.author.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        for width, _, name in jpeg:
+            self.assertContains(response, f'{default_storage.url(name)} '
+                                          f'{width}w')
+        self.assertContains(
+            response, f'src="{default_storage.url(jpeg[1][2])}"'
+        )
+
+    def test_picture_before_variants_are_ready(self):
+        post = self.create_post()
+        with mock.patch(
+            'sorl.thumbnail.base.ThumbnailBackend.get_thumbnail'
+        ) as get_thumbnail:
+            response = self.author.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.id})
+            )
+        get_thumbnail.assert_not_called()
+        self.assertNotContains(response, '<picture>')
+        self.assertContains(response, f'src="{post.image.url}"')
+
+    def test_variants_replace_cached_picture(self):
+        post = self.create_post()
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        self.assertNotContains(self.author.get(url), '<picture>')
+        thumbnails.run_pending()
+        self.assertContains(self.author.get(url), '<picture>')
+
+    def test_rebuild_reuses_saved_variants(self):
+        post = self.create_post()
+        thumbnails.run_pending()
+        variants = Post.objects.feed().get(pk=post.pk).variants
+        with mock.patch('posts.thumbnails.get_thumbnail') as get_thumbnail:
+            thumbnails.build(post)
+        get_thumbnail.assert_not_called()
+        self.assertEqual(Post.objects.feed().get(pk=post.pk).variants,
+                         variants)
+
+    def test_new_image_hides_old_variants(self):
+        post = self.create_post()
+        thumbnails.run_pending()
+        post.image = image_file('other.png')
+        post.save()
+        self.assertEqual(Post.objects.feed().get(pk=post.pk).variants, {})
+
+    def test_stale_job_is_reclaimed(self):
+        post = self.create_post()
+        job = ThumbnailJob.objects.get(post=post)
+        ThumbnailJob.objects.filter(pk=job.pk).update(
+            status=ThumbnailJob.RUNNING, attempts=1
+        )
+        self.assertEqual(thumbnails.run_pending(), 0)
+        ThumbnailJob.objects.filter(pk=job.pk).update(
+            updated=timezone.now() - timedelta(
+                seconds=THUMBNAIL_JOB_TIMEOUT + 1
+            )
+        )
+        self.assertEqual(thumbnails.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ThumbnailJob.DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_stale_job_fails_after_attempts(self):
+        post = self.create_post()
+        ThumbnailJob.objects.filter(post=post).update(
+            status=ThumbnailJob.RUNNING, attempts=3,
+            updated=timezone.now() - timedelta(
+                seconds=THUMBNAIL_JOB_TIMEOUT + 1
+            )
+        )
+        self.assertEqual(thumbnails.run_pending(), 0)
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.FAILED)
+        self.assertTrue(job.error)
+
+    def test_broken_image_fails_after_attempts(self):
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(image='posts/missing.png')
+        with self.assertLogs('posts.thumbnails', 'ERROR'):
+            for _ in range(3):
+                thumbnails.run_pending()
+        job = ThumbnailJob.objects.get(post=post)
+        self.assertEqual(job.status, ThumbnailJob.FAILED)
+        self.assertTrue(job.error)
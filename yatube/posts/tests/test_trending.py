@@ -0,0 +1,123 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import trending
+from posts.models import (
+    CheckpointEvent, Comment, Follow, Post, PostScore, User
+)
+from posts.settings import TRENDING_HALF_LIFE, TRENDING_TOP
+
+USERNAME = 'Maxim'
+FOLLOWER = 'follower'
+POPULAR_URL = reverse('posts:popular')
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.guest = Client()
+        cls.quiet = Post.objects.create(author=cls.user, text='Тихий пост')
+        cls.hot = Post.objects.create(author=cls.user, text='Горячий пост')
+        cls.cold = Post.objects.create(author=cls.user, text='Холодный пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, post, count=1):
+        for _ in range(count):
+            Comment.objects.create(post=post, author=self.user, text='!')
+
+    def test_events_are_counted_once(self):
+        self.comment(self.hot, 2)
+        self.assertEqual(trending.run(), 2)
+        score = PostScore.objects.get(post=self.hot).score
+        self.assertEqual(trending.run(), 0)
+        self.assertEqual(PostScore.objects.get(post=self.hot).score, score)
+        self.comment(self.hot)
+        self.assertEqual(trending.run(), 1)
+        self.assertGreater(PostScore.objects.get(post=self.hot).score, score)
+
+    def test_batches_continue_from_checkpoint(self):
+        self.comment(self.hot, 3)
+        self.assertEqual(trending.run(batch_size=2), 2)
+        self.assertEqual(trending.run(batch_size=2), 1)
+        self.assertEqual(trending.run(batch_size=2), 0)
+
+    def test_late_commit_with_lower_id_is_counted(self):
+        Comment.objects.create(
+            pk=1000, post=self.hot, author=self.user, text='!'
+        )
+        self.assertEqual(trending.run(), 1)
+        Comment.objects.create(
+            pk=500, post=self.hot, author=self.user, text='!'
+        )
+        self.assertEqual(trending.run(), 1)
+        self.assertEqual(trending.run(), 0)
+
+    def test_events_outside_overlap_are_forgotten(self):
+        self.comment(self.hot)
+        Comment.objects.update(created=F('created') - 2 * trending.OVERLAP)
+        self.assertEqual(trending.run(), 1)
+        self.comment(self.hot)
+        self.assertEqual(trending.run(), 1)
+        self.assertEqual(
+            list(CheckpointEvent.objects.values_list('event_id', flat=True)),
+            [Comment.objects.latest('created').pk]
+        )
+        self.assertEqual(trending.run(), 0)
+
+    def test_follow_credits_latest_post(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        self.assertEqual(trending.run(), 1)
+        self.assertEqual(
+            list(PostScore.objects.values_list('post', flat=True)),
+            [self.cold.id]
+        )
+
+    def test_score_decays(self):
+        now = trending.EPOCH + 10 * TRENDING_HALF_LIFE
+        score = trending.level(4, now)
+        self.assertAlmostEqual(trending.decayed(score, now), 4)
+        self.assertAlmostEqual(
+            trending.decayed(score, now + TRENDING_HALF_LIFE), 2
+        )
+        self.assertAlmostEqual(
+            trending.decayed(trending.combine(score, score), now), 8
+        )
+
+    def test_popular_is_ranked(self):
+        self.comment(self.hot, 3)
+        self.comment(self.quiet)
+        trending.run()
+        response = self.guest.get(POPULAR_URL)
+        self.assertEqual(
+            list(response.context['posts']), [self.hot, self.quiet]
+        )
+        self.assertContains(response, self.hot.text)
+        self.assertNotContains(response, self.cold.text)
+
+    def test_popular_follows_new_scores(self):
+        self.guest.get(POPULAR_URL)
+        self.comment(self.cold)
+        trending.run()
+        self.assertContains(self.guest.get(POPULAR_URL), self.cold.text)
+
+    def test_popular_query_budget(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}')
+            for i in range(TRENDING_TOP)
+        )
+        for post in Post.objects.all():
+            self.comment(post)
+        trending.run()
+        self.guest.get(POPULAR_URL)
+        cache.clear()
+        # Версии живут в кэше, в базу уходит одна выборка постов.
+        with self.assertNumQueries(1):
+            response = self.guest.get(POPULAR_URL)
+        self.assertEqual(len(response.context['posts']), TRENDING_TOP)
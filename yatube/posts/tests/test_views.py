@@ -1,9 +1,18 @@
+from unittest import mock
+
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.core.checks import run_checks
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.http import http_date
 
+from posts import caching
 from posts.models import Post, Group, User, Follow, Comment
-from posts.settings import POSTS_ON_PAGE
+from posts.settings import (
+    COMMENTS_ON_PAGE, PAGE_CACHE_HEADER, POSTS_ON_PAGE
+)
 
 
 TEST_SLUG = 'test_slug'
@@ -29,6 +38,7 @@ PROFILE_FOLLOW_URL = reverse(
     kwargs={'username': USERNAME}
 )
 POSTS_ON_SECOND_PAGE = 3
+COMMENTS_ON_SECOND_PAGE = 5
 
 
 class PostPagesTests(TestCase):
@@ -120,13 +130,73 @@ class PostPagesTests(TestCase):
     def test_cache_on_index_page(self):
         cache.clear()
         response = self.author.get(INDEX_URL)
-        Post.objects.all().delete()
+        Post.objects.update(text='Текст, изменённый в обход сигналов')
         second_response = self.author.get(INDEX_URL)
         self.assertEqual(response.content, second_response.content)
         cache.clear()
         third_response = self.author.get(INDEX_URL)
         self.assertNotEqual(response.content, third_response.content)
 
+    def test_cache_invalidated_on_changes(self):
+        cases = [
+            (INDEX_URL, self.author),
+            (GROUP_URL, self.author),
+            (PROFILE_URL, self.author),
+            (self.POST_DEATAIL_URL, self.author),
+            (FOLLOW_INDEX_URL, self.follow_client),
+        ]
+        Follow.objects.create(user=self.follower, author=self.user)
+        for url, client in cases:
+            with self.subTest(url=url):
+                cache.clear()
+                client.get(url)
+                post = Post.objects.get(pk=self.post.pk)
+                post.text = f'Новый текст для {url}'
+                post.save()
+                self.assertContains(client.get(url), post.text)
+
+    def test_cache_invalidated_on_group_rename(self):
+        Follow.objects.create(user=self.follower, author=self.user)
+        for url, client in [
+            (INDEX_URL, self.author),
+            (PROFILE_URL, self.author),
+            (self.POST_DEATAIL_URL, self.author),
+            (FOLLOW_INDEX_URL, self.follow_client),
+        ]:
+            with self.subTest(url=url):
+                cache.clear()
+                client.get(url)
+                group = Group.objects.get(pk=self.group.pk)
+                group.title = f'Новое название для {url}'
+                group.save()
+                self.assertContains(client.get(url), group.title)
+
+    def test_cache_invalidated_on_user_rename(self):
+        for url in [INDEX_URL, GROUP_URL, PROFILE_URL, self.POST_DEATAIL_URL]:
+            with self.subTest(url=url):
+                cache.clear()
+                self.author.get(url)
+                user = User.objects.get(pk=self.user.pk)
+                user.first_name = f'Имя{len(url)}'
+                user.last_name = 'Новое'
+                user.save()
+                self.assertContains(
+                    self.author.get(url), user.get_full_name()
+                )
+
+    def test_comment_bumps_post_detail_version(self):
+        cache.clear()
+        response = self.author.get(self.POST_DEATAIL_URL)
+        Comment.objects.create(
+            author=self.user,
+            text='Новый комментарий',
+            post=self.post,
+        )
+        self.assertNotEqual(
+            response.context['cache_version'],
+            self.author.get(self.POST_DEATAIL_URL).context['cache_version']
+        )
+
     def test_users_can_unfollow(self):
         Follow.objects.create(author=self.user, user=self.follower)
         self.follow_client.get(
@@ -190,3 +260,303 @@ class PaginatorViewsTest(TestCase):
             response = self.author.get(f'{url}?page=2')
             self.assertEqual(len(response.context['page_obj']),
                              POSTS_ON_SECOND_PAGE)
+
+    def test_cursor_pages(self):
+        urls = [
+            INDEX_URL,
+            GROUP_URL,
+            PROFILE_URL,
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.author.get(url).context['page_obj']
+                second = self.author.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), POSTS_ON_SECOND_PAGE)
+                self.assertEqual(second.number, 2)
+                self.assertIsNone(second.next_cursor)
+                self.assertFalse(set(first) & set(second))
+                back = self.author.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertIsNone(back.previous_cursor)
+
+    def test_page_number_and_cursor_agree(self):
+        first = self.author.get(INDEX_URL).context['page_obj']
+        by_number = self.author.get(f'{INDEX_URL}?page=2')
+        by_cursor = self.author.get(INDEX_URL, {'cursor': first.next_cursor})
+        self.assertEqual(
+            list(by_number.context['page_obj']),
+            list(by_cursor.context['page_obj'])
+        )
+
+    def test_broken_cursor_shows_first_page(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.author.get(INDEX_URL, {'cursor': 'broken'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_PAGE)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] or 'OFFSET' in query['sql']
+            for query in queries
+        ))
+
+    def test_links_are_cursors(self):
+        second = self.author.get(INDEX_URL, {
+            'cursor': self.author.get(INDEX_URL).context[
+                'page_obj'
+            ].next_cursor
+        })
+        self.assertNotContains(second, '?page=')
+        self.assertContains(second, '?cursor=')
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.guest = Client()
+        cls.post = Post.objects.create(author=cls.user, text=TEST_TEXT)
+        Comment.objects.bulk_create(Comment(
+            author=cls.user,
+            post=cls.post,
+            text=f'Комментарий {i}'
+        ) for i in range(COMMENTS_ON_PAGE + COMMENTS_ON_SECOND_PAGE))
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id}
+        )
+        cls.comments_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.id}
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_comments(self):
+        comments = self.guest.get(self.detail_url).context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        self.assertEqual(
+            list(comments),
+            list(self.post.comments.order_by('-created', '-id')
+                 [:COMMENTS_ON_PAGE])
+        )
+        self.assertIsNotNone(comments.next_cursor)
+
+    def test_load_more_fragment(self):
+        first = self.guest.get(self.detail_url).context['comments']
+        response = self.guest.get(
+            self.comments_url, {'cursor': first.next_cursor}
+        )
+        second = response.context['comments']
+        self.assertEqual(len(second), COMMENTS_ON_SECOND_PAGE)
+        self.assertFalse(set(first) & set(second))
+        self.assertIsNone(second.next_cursor)
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_load_more_json(self):
+        response = self.guest.get(
+            self.comments_url, HTTP_ACCEPT='application/json'
+        )
+        data = response.json()
+        self.assertIn('Комментарий', data['html'])
+        self.assertIsNotNone(data['next_cursor'])
+
+    def test_comments_of_missing_post(self):
+        response = self.guest.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER)
+        cls.group = Group.objects.create(
+            title=TEST_TITLE,
+            slug=TEST_SLUG,
+            description=TEST_DESCRIPTION
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text=TEST_TEXT,
+            group=cls.group
+        )
+        cls.urls = [
+            INDEX_URL,
+            GROUP_URL,
+            PROFILE_URL,
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        ]
+        cls.guest = Client()
+        cls.follow_client = Client()
+        cls.follow_client.force_login(cls.follower)
+
+    def setUp(self):
+        cache.clear()
+
+    def revalidate(self, client, url):
+        # Первый показ формы ставит CSRF-куку, от неё тоже зависит ETag.
+        client.get(url)
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_modified(self):
+        for url in self.urls + [FOLLOW_INDEX_URL]:
+            with self.subTest(url=url):
+                response = self.revalidate(self.follow_client, url)
+                self.assertEqual(response.status_code, 304)
+
+    def test_not_modified_skips_rendering(self):
+        etag = self.guest.get(INDEX_URL)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest.get(INDEX_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def at(self, moment):
+        return mock.patch.object(caching, '_now', return_value=moment)
+
+    def test_last_modified_only_for_guests(self):
+        self.guest.get(INDEX_URL)
+        with self.at(caching._now() + caching.SECOND):
+            response = self.guest.get(INDEX_URL)
+            self.assertEqual(
+                self.guest.get(
+                    INDEX_URL,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                ).status_code,
+                304
+            )
+            self.assertFalse(
+                self.follow_client.get(INDEX_URL).has_header('Last-Modified')
+            )
+
+    def test_change_within_second_is_not_lost(self):
+        second = caching._now() // caching.SECOND + 1
+        with self.at(second * caching.SECOND + 100):
+            self.assertFalse(
+                self.guest.get(INDEX_URL).has_header('Last-Modified')
+            )
+        with self.at(second * caching.SECOND + 200):
+            caching.bump(caching.ALL_POSTS)
+            self.assertEqual(
+                self.guest.get(
+                    INDEX_URL, HTTP_IF_MODIFIED_SINCE=http_date(second)
+                ).status_code,
+                200
+            )
+
+    def test_etag_depends_on_viewer_and_address(self):
+        self.assertNotEqual(
+            self.guest.get(INDEX_URL)['ETag'],
+            self.follow_client.get(INDEX_URL)['ETag']
+        )
+        self.assertNotEqual(
+            self.guest.get(INDEX_URL)['ETag'],
+            self.guest.get(INDEX_URL, {'page': 2})['ETag']
+        )
+
+    def test_changes_invalidate_etag(self):
+        etags = {url: self.guest.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.user, text='Т')
+        Post.objects.create(author=self.user, text=TEST_TEXT, group=self.group)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_follow_invalidates_profile(self):
+        etag = self.follow_client.get(PROFILE_URL)['ETag']
+        Follow.objects.create(user=self.follower, author=self.user)
+        response = self.follow_client.get(
+            PROFILE_URL, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.group = Group.objects.create(
+            title=TEST_TITLE,
+            slug=TEST_SLUG,
+            description=TEST_DESCRIPTION
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text=TEST_TEXT,
+            group=cls.group
+        )
+        # Запросы на попадание: поиск объекта страницы для версий.
+        cls.hit_queries = {
+            INDEX_URL: 0,
+            GROUP_URL: 1,
+            PROFILE_URL: 1,
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}): 1,
+        }
+        cls.urls = list(cls.hit_queries)
+        cls.guest = Client()
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_pages_are_cached(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.guest.get(url)
+                self.assertEqual(first[PAGE_CACHE_HEADER], 'MISS')
+                with self.assertNumQueries(self.hit_queries[url]):
+                    second = self.guest.get(url)
+                self.assertEqual(second[PAGE_CACHE_HEADER], 'HIT')
+                self.assertEqual(second.content, first.content)
+
+    def test_query_string_is_part_of_key(self):
+        self.guest.get(INDEX_URL)
+        response = self.guest.get(INDEX_URL, {'page': 2})
+        self.assertEqual(response[PAGE_CACHE_HEADER], 'MISS')
+
+    def test_authenticated_requests_bypass_cache(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.author.get(url)
+                response = self.author.get(url)
+                self.assertEqual(response[PAGE_CACHE_HEADER], 'BYPASS')
+                self.assertIsNotNone(response.context)
+
+    def test_writes_invalidate_cached_pages(self):
+        for url in self.urls:
+            self.guest.get(url)
+        Comment.objects.create(post=self.post, author=self.user, text='Т')
+        Post.objects.create(author=self.user, text=TEST_TEXT, group=self.group)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertEqual(response[PAGE_CACHE_HEADER], 'MISS')
+
+
+class SharedCacheCheckTests(TestCase):
+    def errors(self):
+        return [
+            error.id for error in run_checks(include_deployment_checks=True)
+            if error.id.startswith('posts.')
+        ]
+
+    def test_process_local_cache_is_rejected(self):
+        self.assertEqual(self.errors(), ['posts.E001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/yatube-check',
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(self.errors(), [])
@@ -0,0 +1,170 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from posts.settings import (
+    THUMBNAIL_FORMATS, THUMBNAIL_JOB_TIMEOUT, THUMBNAIL_MAX_ATTEMPTS,
+    THUMBNAIL_OPTIONS, THUMBNAIL_RATIO, THUMBNAIL_WIDTHS, THUMBNAIL_WORKERS
+)
+from .models import Thumbnail, ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def enqueue(post):
+    """Ставит пост в очередь; миниатюры начнут готовиться после коммита."""
+    job = ThumbnailJob.objects.create(post=post)
+    if THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _submit(job.id))
+    return job
+
+
+def _submit(job_id):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+        )
+    _executor.submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        run(job_id)
+    finally:
+        connection.close()
+
+
+def _stale():
+    """Задачи, чей воркер не отчитался за THUMBNAIL_JOB_TIMEOUT секунд."""
+    return Q(
+        status=ThumbnailJob.RUNNING,
+        updated__lt=timezone.now() - timedelta(seconds=THUMBNAIL_JOB_TIMEOUT)
+    )
+
+
+def _claimable():
+    return Q(status=ThumbnailJob.PENDING) | (
+        _stale() & Q(attempts__lt=THUMBNAIL_MAX_ATTEMPTS)
+    )
+
+
+def run(job_id):
+    claimed = ThumbnailJob.objects.filter(_claimable(), pk=job_id).update(
+        status=ThumbnailJob.RUNNING, attempts=F('attempts') + 1,
+        updated=timezone.now()
+    )
+    if not claimed:
+        return False
+    job = ThumbnailJob.objects.select_related('post').get(pk=job_id)
+    try:
+        build(job.post)
+    except Exception as error:
+        logger.exception('Не удалось подготовить миниатюры поста %s',
+                         job.post_id)
+        job.error = repr(error)
+        job.status = (
+            ThumbnailJob.FAILED if job.attempts >= THUMBNAIL_MAX_ATTEMPTS
+            else ThumbnailJob.PENDING
+        )
+    else:
+        job.error = ''
+        job.status = ThumbnailJob.DONE
+    job.save(update_fields=['status', 'error', 'updated'])
+    return job.status == ThumbnailJob.DONE
+
+
+def run_pending(limit=None):
+    """Выполняет задачи из очереди и брошенные упавшими воркерами."""
+    ThumbnailJob.objects.filter(
+        _stale(), attempts__gte=THUMBNAIL_MAX_ATTEMPTS
+    ).update(
+        status=ThumbnailJob.FAILED, error='Воркер не завершил задачу',
+        updated=timezone.now()
+    )
+    jobs = ThumbnailJob.objects.filter(
+        _claimable()
+    ).values_list('id', flat=True)
+    if limit:
+        jobs = jobs[:limit]
+    return sum(run(job_id) for job_id in list(jobs))
+
+
+def build(post):
+    if not post.image:
+        Thumbnail.objects.filter(post=post).delete()
+        return
+    known = Thumbnail.objects.filter(
+        post=post, image=post.image.name
+    ).first()
+    variants, _ = make_variants(
+        post.image.name, known.get_variants() if known else None
+    )
+    save_variants(post.id, post.image.name, variants)
+
+
+def save_variants(post_id, image, variants):
+    Thumbnail.objects.update_or_create(
+        post_id=post_id,
+        defaults={
+            'image': image,
+            'variants': json.dumps(variants, separators=(',', ':')),
+        }
+    )
+
+
+def formats():
+    """Форматы из THUMBNAIL_FORMATS, которые умеет сохранять Pillow."""
+    Image.init()
+    return [fmt for fmt in THUMBNAIL_FORMATS if fmt in Image.SAVE]
+
+
+def height(width):
+    ratio_width, ratio_height = THUMBNAIL_RATIO
+    return round(width * ratio_height / ratio_width)
+
+
+def geometry(width):
+    return f'{width}x{height(width)}'
+
+
+def make_variants(image, known=None):
+    """Готовит все варианты картинки, пропуская уже готовые.
+
+    ``known`` — варианты той же картинки из её Thumbnail: вариант нужного
+    формата и размера, чей файл есть в хранилище, не создаётся заново.
+    Возвращает ``{формат: [[ширина, высота, имя файла], ...]}`` и число
+    реально созданных файлов.
+    """
+    if not default_storage.exists(image):
+        raise FileNotFoundError(image)
+    known = {
+        (fmt, width, height): name
+        for fmt, sizes in (known or {}).items()
+        for width, height, name in sizes
+    }
+    variants = {}
+    generated = 0
+    for fmt in formats():
+        options = {**THUMBNAIL_OPTIONS, 'format': fmt}
+        sizes = variants[fmt.lower()] = []
+        for width in THUMBNAIL_WIDTHS:
+            size = [width, height(width)]
+            name = known.get((fmt.lower(), *size))
+            if name is None or not default_storage.exists(name):
+                thumbnail = get_thumbnail(image, geometry(width), **options)
+                generated += 1
+                size = [thumbnail.width, thumbnail.height]
+                name = thumbnail.name
+            sizes.append([*size, name])
+    return variants, generated
@@ -0,0 +1,120 @@
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Max
+
+from posts.settings import (
+    TRENDING_BATCH_SIZE, TRENDING_COMMENT_WEIGHT, TRENDING_FOLLOW_WEIGHT,
+    TRENDING_HALF_LIFE, TRENDING_OVERLAP
+)
+from . import caching
+from .models import (
+    Checkpoint, CheckpointEvent, Comment, Follow, Post, PostScore
+)
+
+# Начало отсчёта рейтингов, 2020-01-01 UTC.
+EPOCH = 1577836800
+COMMENTS = 'trending:comments'
+FOLLOWS = 'trending:follows'
+OVERLAP = timedelta(seconds=TRENDING_OVERLAP)
+
+
+def level(weight, timestamp):
+    """Вклад события в рейтинг, хранимый как log2."""
+    return math.log2(weight) + (timestamp - EPOCH) / TRENDING_HALF_LIFE
+
+
+def combine(first, second):
+    """log2(2^first + 2^second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def decayed(score, timestamp=None):
+    """Рейтинг с учётом затухания на момент ``timestamp``."""
+    timestamp = time.time() if timestamp is None else timestamp
+    return 2 ** (score - (timestamp - EPOCH) / TRENDING_HALF_LIFE)
+
+
+def run(batch_size=TRENDING_BATCH_SIZE):
+    """Учитывает комментарии и подписки, появившиеся с прошлого запуска.
+
+    Подписка добавляет вес последнему посту автора: скорее всего, его и
+    читали перед подпиской. Возвращает число обработанных событий.
+    """
+    with transaction.atomic():
+        comments = _take(COMMENTS, Comment.objects.values_list(
+            'pk', 'post_id', 'created'
+        ), batch_size)
+        follows = _take(FOLLOWS, Follow.objects.values_list(
+            'pk', 'author_id', 'created'
+        ), batch_size)
+        levels = defaultdict(list)
+        for _, post_id, created in comments:
+            levels[post_id].append(
+                level(TRENDING_COMMENT_WEIGHT, created.timestamp())
+            )
+        if follows:
+            latest = dict(
+                Post.objects.filter(
+                    author_id__in={author_id for _, author_id, _ in follows}
+                ).order_by().values('author_id').annotate(last=Max('id'))
+                .values_list('author_id', 'last')
+            )
+            now = time.time()
+            for _, author_id, _ in follows:
+                if author_id in latest:
+                    levels[latest[author_id]].append(
+                        level(TRENDING_FOLLOW_WEIGHT, now)
+                    )
+        _apply(levels)
+    if levels:
+        caching.bump(caching.TRENDING)
+    return len(comments) + len(follows)
+
+
+def _take(name, events, batch_size):
+    # События читаются по времени, последним полем. Id на PostgreSQL
+    # фиксируются не по порядку, поэтому окно OVERLAP перед контрольной
+    # точкой перечитывается, а учтённые в нём события отсекаются
+    # по CheckpointEvent.
+    checkpoint, _ = Checkpoint.objects.select_for_update().get_or_create(
+        name=name
+    )
+    seen = CheckpointEvent.objects.filter(checkpoint=checkpoint)
+    if checkpoint.moment is not None:
+        events = events.filter(created__gte=checkpoint.moment - OVERLAP)
+    rows = list(
+        events.exclude(pk__in=seen.values('event_id'))
+        .order_by('created', 'pk')[:batch_size]
+    )
+    if rows:
+        CheckpointEvent.objects.bulk_create(
+            CheckpointEvent(
+                checkpoint=checkpoint, event_id=row[0], created=row[-1]
+            )
+            for row in rows
+        )
+        last = rows[-1][-1]
+        if checkpoint.moment is None or last > checkpoint.moment:
+            checkpoint.moment = last
+            checkpoint.save(update_fields=['moment'])
+        seen.filter(created__lt=checkpoint.moment - OVERLAP).delete()
+    return rows
+
+
+def _apply(levels):
+    scores = PostScore.objects.in_bulk(list(levels))
+    created = []
+    for post_id, values in levels.items():
+        value = reduce(combine, values)
+        if post_id in scores:
+            scores[post_id].score = combine(scores[post_id].score, value)
+        else:
+            created.append(PostScore(post_id=post_id, score=value))
+    PostScore.objects.bulk_update(scores.values(), ['score'])
+    PostScore.objects.bulk_create(created)
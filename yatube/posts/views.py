@@ -1,65 +1,235 @@
+from functools import wraps
+
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Exists, OuterRef
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404
 from django.shortcuts import redirect
+from django.template.loader import render_to_string
 
-from posts.settings import POSTS_ON_PAGE
+from posts.settings import (
+    COMMENTS_ON_PAGE, GROUPS_ON_PAGE, POSTS_ON_PAGE, TRENDING_TOP
+)
+from . import caching, counters, thumbnails
+from .feeds import FollowPaginator
 from .forms import PostForm, CommentForm
-from .models import Follow, Post, Group, User
+from .models import Counter, Follow, Post, Group, User
+from .paginator import KeysetPaginator
+from .search import SearchResults
+
+
+def peginator_page(request, posts, count_scope=None, count=None):
+    return paginate(request, KeysetPaginator(
+        posts, POSTS_ON_PAGE, count_scope=count_scope, count=count
+    ))
+
+
+def paginate(request, paginator):
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    page = request.GET.get('page')
+    if page:
+        return paginator.get_page(page)
+    return paginator.first_page()
+
+
+def comments_page(request, post):
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'), COMMENTS_ON_PAGE,
+        ordering=('-created', '-id')
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    return paginator.first_page()
+
+
+def per_request(loader):
+    """Объект страницы грузится один раз: для валидаторов и для вьюхи."""
+    @wraps(loader)
+    def wrapper(request, *args, **kwargs):
+        key = f'_{loader.__name__}'
+        if not hasattr(request, key):
+            setattr(request, key, loader(request, *args, **kwargs))
+        return getattr(request, key)
+    return wrapper
+
+
+@per_request
+def load_group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    counters.group_stats([group])
+    return group
+
+
+@per_request
+def load_post(request, post_id):
+    return get_object_or_404(Post.objects.feed(), pk=post_id)
+
+
+@per_request
+def profile_author(request, username):
+    """Автор вместе со статистикой и подпиской зрителя — одним запросом."""
+    authors = User.objects.select_related('stats')
+    if request.user.is_authenticated:
+        authors = authors.annotate(is_followed=Exists(
+            Follow.objects.filter(user=request.user, author=OuterRef('pk'))
+        ))
+    author = get_object_or_404(authors, username=username)
+    if not hasattr(author, 'stats'):
+        author.stats = counters.user_stats(author.id)
+    return author
+
+
+def index_scopes(request):
+    return [caching.ALL_POSTS]
+
+
+def group_scopes(request, slug):
+    return [caching.GROUP.format(load_group(request, slug).id)]
+
+
+def profile_scopes(request, username):
+    return [caching.AUTHOR.format(profile_author(request, username).id)]
+
 
+def post_scopes(request, post_id):
+    post = load_post(request, post_id)
+    return [
+        caching.POST.format(post.id), caching.AUTHOR.format(post.author_id)
+    ]
 
-def peginator_page(request, posts):
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    return paginator.get_page(request.GET.get('page'))
 
+def follow_scopes(request):
+    return [caching.ALL_POSTS, caching.FOLLOW.format(request.user.id)]
 
+
+def popular_scopes(request):
+    return [caching.ALL_POSTS, caching.TRENDING]
+
+
+def groups_scopes(request):
+    return [caching.GROUPS]
+
+
+@caching.conditional(index_scopes)
+@caching.page_cache(index_scopes)
 def index(request):
     return render(request, 'posts/index.html', {
-        'page_obj': peginator_page(request, Post.objects.all())
+        'page_obj': peginator_page(
+            request, Post.objects.feed(), (Counter.ALL, 0)
+        ),
+        'cache_version': caching.version(caching.ALL_POSTS),
+    })
+
+
+@caching.conditional(popular_scopes)
+@caching.page_cache(popular_scopes)
+def popular(request):
+    return render(request, 'posts/popular.html', {
+        'posts': Post.objects.feed().filter(
+            score__isnull=False
+        ).order_by('-score__score')[:TRENDING_TOP],
+        'cache_version': caching.version(*popular_scopes(request)),
+    })
+
+
+@caching.conditional(groups_scopes)
+@caching.page_cache(groups_scopes)
+def group_index(request):
+    groups = Paginator(Group.objects.order_by('title', 'id'), GROUPS_ON_PAGE)
+    page = groups.get_page(request.GET.get('page'))
+    page.object_list = counters.group_stats(list(page.object_list))
+    return render(request, 'posts/groups.html', {
+        'page_obj': page,
+        'cache_version': caching.version(caching.GROUPS),
     })
 
 
+@caching.conditional(group_scopes)
+@caching.page_cache(group_scopes)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = load_group(request, slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': peginator_page(request, group.posts.all())
+        'page_obj': peginator_page(
+            request, group.posts.feed(), count=group.post_count
+        ),
+        'cache_version': caching.version(caching.GROUP.format(group.id)),
     })
 
 
+@caching.conditional(profile_scopes)
+@caching.page_cache(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = profile_author(request, username)
     following = (
-        request.user.is_authenticated
-        and request.user != author
-        and Follow.objects.filter(
-            user=request.user, author=author).exists()
+        request.user != author and getattr(author, 'is_followed', False)
     )
     return render(request, 'posts/profile.html', {
         'following': following,
         'author': author,
-        'page_obj': peginator_page(request, author.posts.all()),
+        'stats': author.stats,
+        'page_obj': peginator_page(
+            request, author.posts.feed(), count=author.stats.posts
+        ),
+        'cache_version': caching.version(caching.AUTHOR.format(author.id)),
     })
 
 
+@caching.conditional(post_scopes)
+@caching.page_cache(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = load_post(request, post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.select_related('author')
+    comments = comments_page(request, post)
     context = {
         'form': form,
         'comments': comments,
         'post': post,
+        'author_stats': counters.user_stats(post.author_id),
+        'cache_version': caching.version(
+            caching.POST.format(post.id), caching.AUTHOR.format(post.author_id)
+        ),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), POSTS_ON_PAGE)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    })
+
+
+def post_comments(request, post_id):
+    post = get_object_or_404(Post, pk=post_id)
+    comments = comments_page(request, post)
+    html = render_to_string(
+        'posts/includes/comment_list.html',
+        {'comments': comments, 'post': post},
+        request
+    )
+    if 'application/json' in request.headers.get('Accept', ''):
+        return JsonResponse({
+            'html': html,
+            'next_cursor': comments.next_cursor,
+        })
+    return HttpResponse(html)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, request.FILES or None)
     if form.is_valid():
         form.instance.author = request.user
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post)
         return redirect('posts:profile', request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -76,6 +246,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.enqueue(post)
         return redirect('posts:post_detail', post_id=post.pk)
     context = {
         'form': form,
@@ -98,13 +270,17 @@ def add_comment(request, post_id):
 
 
 @login_required
+@caching.conditional(follow_scopes)
 def follow_index(request):
     return render(
         request,
         'posts/follow.html', {
-            'page_obj': peginator_page(
-                request,
-                Post.objects.filter(author__following__user=request.user))
+            'page_obj': paginate(
+                request, FollowPaginator(request.user, POSTS_ON_PAGE)
+            ),
+            'cache_version': caching.version(
+                caching.ALL_POSTS, caching.FOLLOW.format(request.user.id)
+            ),
         })
 
 
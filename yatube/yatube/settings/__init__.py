@@ -0,0 +1,13 @@
+"""
+Settings for yatube project.
+
+YATUBE_ENV picks the layer: dev (default) or prod. A layer can also be
+set directly, e.g. DJANGO_SETTINGS_MODULE=yatube.settings.prod.
+"""
+
+import os
+
+if os.environ.get('YATUBE_ENV', 'dev') == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    from .dev import *  # noqa: F401,F403
@@ -0,0 +1,237 @@
+"""
+Django settings for yatube project shared by all environments.
+
+The dev and prod modules build on these; values that differ between
+deployments are read from YATUBE_* environment variables.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('YATUBE_SECRET_KEY')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('YATUBE_ALLOWED_HOSTS', '').split(',')
+    if host
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'sorl.thumbnail'
+]
+
+MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+# Parse all templates in TEMPLATES DIRS when a WSGI worker starts, so that
+# a cached loader serves the first request and broken templates fail the boot.
+PRECOMPILE_TEMPLATES = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+# YATUBE_DB_ENGINE=postgresql switches to PostgreSQL (needs psycopg2) with
+# the YATUBE_DB_* connection parameters.
+DB_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgresql': 'django.db.backends.postgresql',
+}
+DB_ENGINE = os.environ.get('YATUBE_DB_ENGINE', 'sqlite')
+
+DATABASES = {
+    'default': {
+        'ENGINE': DB_ENGINES[DB_ENGINE],
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME',
+            os.path.join(BASE_DIR, 'db.sqlite3')
+            if DB_ENGINE == 'sqlite' else 'yatube'
+        ),
+        'USER': os.environ.get('YATUBE_DB_USER', ''),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', ''),
+        'PORT': os.environ.get('YATUBE_DB_PORT', ''),
+        # Seconds a worker thread keeps its connection between requests;
+        # 0 reconnects on every request.
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
+    }
+}
+
+# Behind PgBouncer in transaction pooling mode a server-side cursor does
+# not outlive its transaction, so .iterator() must fetch client-side.
+if os.environ.get('YATUBE_DB_POOLER') == 'pgbouncer':
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# PRAGMAs run on every new SQLite connection (core.signals). WAL lets
+# requests read while another one writes, and with WAL synchronous=NORMAL
+# can only lose the last commits on power loss, never corrupt the file.
+# YATUBE_SQLITE_PRAGMAS overrides them: "synchronous=full,mmap_size=0".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative: KiB rather than pages.
+    'cache_size': -64 * 1024,
+}
+SQLITE_PRAGMAS.update(
+    pragma.split('=', 1)
+    for pragma in os.environ.get('YATUBE_SQLITE_PRAGMAS', '').split(',')
+    if pragma
+)
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+# Request instrumentation (core.middleware.PerfMiddleware): the share of
+# requests to measure, 0 removes the middleware. Samples are kept per view
+# in a rolling window of PERF_WINDOW requests and published to the cache
+# every PERF_FLUSH_INTERVAL seconds for `manage.py perf_report`.
+PERF_SAMPLE_RATE = float(os.environ.get('YATUBE_PERF_SAMPLE_RATE', 0))
+PERF_WINDOW = 1000
+PERF_FLUSH_INTERVAL = 10
+PERF_TTL = 60 * 60
+# Timings leak how the page is built, so the Server-Timing header goes to
+# staff only unless this is on.
+PERF_SERVER_TIMING = os.environ.get('YATUBE_PERF_SERVER_TIMING') == '1'
+# Also time every {% include %}, {% url %}, template tag and filter of sampled
+# requests; `manage.py perf_report --flamegraph` dumps them as folded stacks.
+PERF_TEMPLATE_PROFILE = os.environ.get('YATUBE_PERF_TEMPLATES') == '1'
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Backend is picked by YATUBE_CACHE. Everything except locmem is shared
+# between worker processes; db needs `manage.py createcachetable`,
+# memcached needs python-memcached and redis needs django-redis.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': (
+        'django.core.cache.backends.filebased.FileBasedCache',
+        os.path.join(BASE_DIR, 'cache'),
+    ),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'memcached': (
+        'django.core.cache.backends.memcached.MemcachedCache',
+        '127.0.0.1:11211',
+    ),
+    'redis': ('django_redis.cache.RedisCache', 'redis://127.0.0.1:6379/1'),
+}
+
+CACHE_NAME = os.environ.get('YATUBE_CACHE', 'locmem')
+if CACHE_NAME not in CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f'Unknown YATUBE_CACHE {CACHE_NAME!r}, '
+        f'expected one of: {", ".join(sorted(CACHE_BACKENDS))}.'
+    )
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[CACHE_NAME]
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', CACHE_LOCATION),
+    }
+}
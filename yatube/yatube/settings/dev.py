@@ -0,0 +1,25 @@
+"""
+Development settings for yatube project: DEBUG and local hosts.
+"""
+
+import os
+
+from .base import *  # noqa: F401,F403
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+SECRET_KEY = os.environ.get(
+    'YATUBE_SECRET_KEY', 'v+85g+nwbr04yx-fl85l2f2trc^3%8#d^-uh&+&p9%&abcp+-0'
+)
+
+DEBUG = True
+
+PERF_SERVER_TIMING = True
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
@@ -0,0 +1,41 @@
+"""
+Production settings for yatube project.
+
+YATUBE_SECRET_KEY, YATUBE_ALLOWED_HOSTS and YATUBE_CACHE are required.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import TEMPLATES
+
+# Cache scope versions (posts.caching) must be shared by all workers, so
+# the per-process locmem default is not an option here.
+SHARED_CACHES = ('memcached', 'redis')
+if os.environ.get('YATUBE_CACHE') not in SHARED_CACHES:
+    raise ImproperlyConfigured(
+        f'Production needs a shared cache: set YATUBE_CACHE to one of: '
+        f'{", ".join(SHARED_CACHES)}.'
+    )
+
+# Parse every template once per process and keep it in memory: the cached
+# loader never re-reads files, so restart workers after a deploy.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'APP_DIRS': False,
+        'OPTIONS': {
+            **TEMPLATES[0]['OPTIONS'],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+PRECOMPILE_TEMPLATES = True
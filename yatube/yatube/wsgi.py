@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.core.wsgi import get_wsgi_application
 
+from core.precompile import precompile_templates
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.PRECOMPILE_TEMPLATES:
+    _, errors = precompile_templates()
+    if errors:
+        raise ImproperlyConfigured('Broken templates: {}'.format(
+            ', '.join(f'{name} ({error})' for name, error in errors.items())
+        ))